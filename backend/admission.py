@@ -0,0 +1,118 @@
+"""
+Partners - admission.py
+Admission control for the Gemini-backed chemistry check (/match).
+  token bucket        per builder: MATCH_RATE_PER_MIN AI checks a minute,
+                      bursts of MATCH_BURST
+  Gemini slots        at most GEMINI_MAX_CONCURRENT AI checks in flight per
+                      worker; a request never waits for one
+A refused check is not queued: it is answered with the algorithm result
+(brain._algo_match) and marked degraded, so /match latency stays bounded by
+the slowest admitted Gemini call, not by a queue in front of it.
+Limits are per worker, like the bcrypt pool.
+"""
+
+import os
+import time
+import threading
+import contextlib
+from collections import OrderedDict
+
+import metrics
+
+MATCH_RATE_PER_MIN    = float(os.environ.get("MATCH_RATE_PER_MIN", 6))
+MATCH_BURST           = float(os.environ.get("MATCH_BURST", 3))
+GEMINI_MAX_CONCURRENT = int(os.environ.get("GEMINI_MAX_CONCURRENT", 8))
+# Idle buckets are full again after burst / rate; only this many are remembered
+MAX_BUCKETS           = int(os.environ.get("MATCH_MAX_BUCKETS", 10_000))
+
+# Reasons a check was degraded to the algorithm (MatchResponse.degraded)
+RATE_LIMITED = "rate_limited"
+BUSY         = "busy"
+
+degraded_total = metrics.register(metrics.Counter(
+    "partners_match_degraded_total", "Chemistry checks answered by the algorithm instead of Gemini", ("reason",),
+))
+
+_lock = threading.Lock()
+_stats = {"admitted": 0, "rate_limited": 0, "busy": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "limit": GEMINI_MAX_CONCURRENT}
+
+
+# ============================================
+# TOKEN BUCKETS
+# ============================================
+
+class TokenBuckets:
+    """key → (tokens, last refill). Least recently used keys are dropped past max_keys."""
+
+    def __init__(self, rate_per_min: float, burst: float, max_keys: int = MAX_BUCKETS, clock=time.monotonic):
+        self.rate = rate_per_min / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str) -> bool:
+        now = self.clock()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def refund(self, key: str):
+        with self._lock:
+            if key in self._buckets:
+                tokens, last = self._buckets[key]
+                self._buckets[key] = (min(self.burst, tokens + 1), last)
+
+
+match_buckets = TokenBuckets(MATCH_RATE_PER_MIN, MATCH_BURST)
+_gemini_slots = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENT)
+
+
+# ============================================
+# ADMISSION
+# ============================================
+
+@contextlib.contextmanager
+def gemini_match(key: str):
+    """
+    Yields None when the AI check may go ahead (a Gemini slot is held until
+    the block exits), or the reason it may not: RATE_LIMITED or BUSY.
+    """
+    if not match_buckets.take(key):
+        reason = RATE_LIMITED
+    elif not _gemini_slots.acquire(blocking=False):
+        match_buckets.refund(key)   # not the caller's fault — keep their token
+        reason = BUSY
+    else:
+        reason = None
+
+    if reason is not None:
+        degraded_total.inc((reason,))
+        with _lock:
+            _stats[reason] += 1
+        yield reason
+        return
+
+    with _lock:
+        _stats["admitted"] += 1
+        _stats["in_flight"] += 1
+        _stats["max_in_flight"] = max(_stats["max_in_flight"], _stats["in_flight"])
+    try:
+        yield None
+    finally:
+        with _lock:
+            _stats["in_flight"] -= 1
+        _gemini_slots.release()
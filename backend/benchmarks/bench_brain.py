@@ -0,0 +1,174 @@
+"""
+Partners - benchmarks/bench_brain.py
+Micro-benchmarks for the algorithmic matcher in brain.py (no Gemini, no DB):
+  pairwise   ns per call of each scoring/explanation function, over a pool of
+             distinct synthetic pairs (benchmarks/synthetic.py)
+  one_vs_n   ms to score — and fully explain — one builder against N others,
+             the shape of ranking a discover feed
+
+Results are compared against a stored baseline; any metric more than
+--threshold slower fails the run (exit 1). Timings are normalised by a fixed
+pure-Python calibration loop so a baseline recorded on a laptop still means
+something on a CI runner.
+
+Run:  python benchmarks/bench_brain.py                      compare with baseline_brain.json
+      python benchmarks/bench_brain.py --update-baseline    record a new baseline
+      python benchmarks/bench_brain.py --threshold 0.10 --json out.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+os.environ.setdefault("DATABASE_URL", "postgresql://bench@localhost/bench")
+
+import brain
+from synthetic import make_builders
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_brain.json")
+PAIR_POOL = 2_000
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate(repeat: int = 7) -> float:
+    """ns for a fixed dict/set/str workload — the unit every result is normalised by."""
+    words = [f"lang{i % 40}" for i in range(2_000)]
+
+    def work():
+        seen = {}
+        for w in words:
+            key = w.lower().strip()
+            seen[key] = seen.get(key, 0) + 1
+        return len(set(seen) & {"lang1", "lang2"})
+
+    return timed(lambda: [work() for _ in range(20)], repeat) * 1e9
+
+
+# ============================================
+# CASES
+# ============================================
+
+def pairwise_cases(builders: list) -> dict:
+    rng = random.Random(7)
+    pairs = [tuple(rng.sample(builders, 2)) for _ in range(PAIR_POOL)]
+    scored = [(a, b, brain.calculate_skill_synergy(a, b)) for a, b in pairs]
+    return {
+        "get_categories":          (lambda: [brain._get_categories(a["github_languages"]) for a, _ in pairs]),
+        "calculate_skill_synergy": (lambda: [brain.calculate_skill_synergy(a, b) for a, b in pairs]),
+        "algo_why":                (lambda: [brain._algo_why(a, b, s) for a, b, s in scored]),
+        "algo_build_idea":         (lambda: [brain._algo_build_idea(a, b) for a, b in pairs]),
+        "algo_match":              (lambda: [brain._algo_match(a, b, s) for a, b, s in scored]),
+    }
+
+
+def one_vs_n_cases(me: dict, others: list) -> dict:
+    def rank():
+        scores = [(brain.calculate_skill_synergy(me, o), o["username"]) for o in others]
+        scores.sort(reverse=True)
+        return scores[:20]
+
+    return {
+        "score":   (lambda: [brain.calculate_skill_synergy(me, o) for o in others]),
+        "rank":    rank,
+        "explain": (lambda: [brain._algo_match(me, o, brain.calculate_skill_synergy(me, o)) for o in others]),
+    }
+
+
+def run(sizes: list, repeat: int) -> dict:
+    random.seed(42)  # _algo_build_idea falls back to random.choice
+    builders = make_builders(max(max(sizes), PAIR_POOL) + 1, seed=42)
+    results = {}
+
+    for name, fn in pairwise_cases(builders[:PAIR_POOL]).items():
+        results[f"pairwise.{name}.ns_per_call"] = round(timed(fn, repeat) / PAIR_POOL * 1e9, 1)
+
+    me, others = builders[0], builders[1:]
+    for n in sizes:
+        for name, fn in one_vs_n_cases(me, others[:n]).items():
+            results[f"one_vs_n.{n}.{name}.ms"] = round(timed(fn, repeat) * 1000, 3)
+    return results
+
+
+# ============================================
+# BASELINE
+# ============================================
+
+def compare(results: dict, calibration_ns: float, baseline: dict, threshold: float) -> list:
+    """Metrics slower than baseline by more than `threshold`, after normalising for machine speed."""
+    scale = calibration_ns / baseline["calibration_ns"]
+    regressions = []
+    for key, base in baseline["results"].items():
+        if key not in results or not base:
+            continue
+        ratio = results[key] / (base * scale)
+        if ratio > 1 + threshold:
+            regressions.append((key, base * scale, results[key], ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--sizes", default="1000,10000", help="N values for one_vs_n (comma separated)")
+    parser.add_argument("--repeat", type=int, default=7, help="best-of repeats per case")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", dest="json_out", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    # Calibrate on both sides of the run so a burst of load during one is not baked in
+    before = calibrate()
+    results = run(sizes, args.repeat)
+    calibration_ns = min(before, calibrate())
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "calibration_ns": round(calibration_ns),
+        "results": results,
+    }
+
+    for key, value in results.items():
+        print(f"{key:<45} {value:>12,.1f}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline} — run with --update-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, calibration_ns, baseline, args.threshold)
+    print(f"\nMachine speed vs baseline: x{baseline['calibration_ns'] / calibration_ns:.2f}")
+    for key, expected, actual, ratio in regressions:
+        print(f"REGRESSION {key}: {actual:,.1f} vs {expected:,.1f} expected (+{(ratio - 1) * 100:.0f}%)")
+    if not regressions:
+        print(f"OK — no metric more than {args.threshold:.0%} slower than baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
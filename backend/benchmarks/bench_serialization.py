@@ -0,0 +1,95 @@
+"""
+Partners - benchmarks/bench_serialization.py
+Profile-list serialization: legacy Pydantic path vs the orjson fast path.
+
+Legacy  = _row_to_dict → _safe_profile → BuilderProfile, then FastAPI's
+          response_model validation + JSON encoding of the list.
+Fast    = PROFILE_SELECT rows → orjson.dumps (main._json_response).
+
+Run:  python benchmarks/bench_serialization.py  (no database needed)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+from datetime import datetime, timezone, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DATABASE_URL", "postgresql://bench@localhost/bench")
+
+import orjson
+from pydantic import TypeAdapter
+from main import BuilderProfile, _row_to_dict, _safe_profile
+
+LANGS     = ["Python", "TypeScript", "Go", "Rust", "JavaScript", "Swift", "Kotlin", "CSS"]
+INTERESTS = ["ai_ml", "web", "devtools", "open_source", "health", "climate", "games"]
+
+
+def make_row(i: int) -> dict:
+    """One builder row shaped like PROFILE_SELECT output (defaults already applied)."""
+    now = datetime.now(timezone.utc)
+    return {
+        "username": f"builder_{i}",
+        "github_username": f"gh_{i}",
+        "avatar": f"https://avatars.githubusercontent.com/u/{i}",
+        "bio": "Ships frontends before the backend is ready",
+        "building_style": random.choice(["figures_it_out", "planner", "fast_shipper"]),
+        "interests": random.sample(INTERESTS, 3),
+        "open_to": ["weekend projects", "hackathons"],
+        "availability": random.choice(["open", "this_weekend", "this_month"]),
+        "current_idea": None if i % 3 else "builder matching platform",
+        "city": random.choice([None, "Paris", "London", "Berlin"]),
+        "github_languages": random.sample(LANGS, 3),
+        "github_repos": [
+            {"name": f"repo{j}", "description": "a thing", "stars": j, "language": random.choice(LANGS)}
+            for j in range(5)
+        ],
+        "total_stars": random.randint(0, 500),
+        "public_repos": random.randint(0, 80),
+        "learning": random.sample(LANGS, 2),
+        "experience_level": "intermediate",
+        "looking_for": "build_partner",
+        "created_at": now - timedelta(days=i % 90),
+        "updated_at": now,
+    }
+
+
+_list_adapter = TypeAdapter(List[BuilderProfile])
+
+
+def legacy_path(rows: list) -> bytes:
+    profiles = [_safe_profile(_row_to_dict(r)) for r in rows]
+    # What FastAPI does with response_model=List[BuilderProfile]
+    validated = _list_adapter.validate_python(profiles, from_attributes=True)
+    return json.dumps(_list_adapter.dump_python(validated, mode="json")).encode()
+
+
+def fast_path(rows: list) -> bytes:
+    return orjson.dumps(rows)
+
+
+def timed(fn, rows: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    random.seed(42)
+    results = {}
+    for n in (1_000, 10_000):
+        rows = [make_row(i) for i in range(n)]
+        repeat = 5 if n <= 1_000 else 3
+        legacy = timed(legacy_path, rows, repeat)
+        fast = timed(fast_path, rows, repeat)
+        results[n] = {"legacy_ms": round(legacy * 1000, 2), "fast_ms": round(fast * 1000, 2),
+                      "speedup": round(legacy / fast, 1)}
+        print(f"{n:>6} profiles  legacy {legacy * 1000:8.1f} ms   fast {fast * 1000:7.1f} ms   "
+              f"x{legacy / fast:.1f}")
+    print(json.dumps(results))
@@ -0,0 +1,135 @@
+"""
+Partners - benchmarks/synthetic.py
+Synthetic builders with realistic, skewed distributions — popular languages
+and interests dominate, stacks cluster by ecosystem, most builders list no
+city. Deterministic for a given seed. Shared by the benchmarks and the load
+harness seeder (loadtest/seed.py).
+
+    from synthetic import make_builders
+    builders = make_builders(10_000, seed=7)
+"""
+
+import random
+from datetime import datetime, timezone, timedelta
+
+# (language, weight) — roughly GitHub's language popularity
+LANGUAGES = [
+    ("JavaScript", 20), ("Python", 20), ("TypeScript", 16), ("Java", 8), ("Go", 6),
+    ("C++", 5), ("Rust", 4), ("PHP", 4), ("C", 3), ("Swift", 3), ("Kotlin", 3),
+    ("Ruby", 2), ("Dart", 2), ("Shell", 2), ("Jupyter Notebook", 3), ("CSS", 4),
+    ("HTML", 4), ("Vue", 2), ("Svelte", 1), ("Assembly", 0.5),
+]
+
+# Builders rarely spread across ecosystems: pick a home stack, then mostly stay in it
+STACKS = {
+    "frontend": ["JavaScript", "TypeScript", "CSS", "HTML", "Vue", "Svelte"],
+    "backend":  ["Python", "Go", "Java", "PHP", "Ruby", "TypeScript", "Rust"],
+    "ml":       ["Python", "Jupyter Notebook", "C++"],
+    "mobile":   ["Swift", "Kotlin", "Dart", "TypeScript"],
+    "systems":  ["Rust", "C", "C++", "Go", "Assembly"],
+    "devops":   ["Shell", "Go", "Python"],
+}
+STACK_WEIGHTS = {"frontend": 30, "backend": 30, "ml": 15, "mobile": 10, "systems": 7, "devops": 8}
+
+# What people say they want to learn (lower-case, as entered in onboarding)
+LEARNING = [
+    ("react", 12), ("rust", 10), ("python", 8), ("go", 8), ("typescript", 8), ("docker", 7),
+    ("kubernetes", 5), ("fastapi", 4), ("swift", 3), ("kotlin", 3), ("pytorch", 6),
+    ("tensorflow", 3), ("nextjs", 6), ("svelte", 3), ("postgresql", 4), ("figma", 3),
+]
+
+INTERESTS = [
+    ("ai_ml", 25), ("web", 20), ("devtools", 14), ("open_source", 12), ("games", 7),
+    ("fintech", 6), ("health", 5), ("climate", 4), ("education", 4), ("hardware", 3),
+]
+
+# None = left blank, which most builders do
+CITIES = [
+    (None, 45), ("Paris", 10), ("London", 9), ("Berlin", 7), ("San Francisco", 8),
+    ("New York", 6), ("Casablanca", 3), ("Lagos", 3), ("Bangalore", 5), ("Toronto", 4),
+]
+
+BUILDING_STYLES = [("figures_it_out", 40), ("weekend hacker", 20), ("planner", 15),
+                   ("fast_shipper", 15), ("deep diver", 10)]
+EXPERIENCE      = [("beginner", 20), ("intermediate", 45), ("advanced", 25), ("expert", 10)]
+AVAILABILITY    = [("open", 50), ("this_weekend", 15), ("this_month", 20), ("busy", 15)]
+LOOKING_FOR     = [("build_partner", 60), ("cofounder", 15), ("mentor", 10), ("hackathon_team", 15)]
+
+
+def _pick(rng: random.Random, weighted: list):
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights=weights, k=1)[0]
+
+
+def _sample(rng: random.Random, weighted: list, k: int) -> list:
+    """k distinct values, weighted."""
+    chosen = []
+    pool = list(weighted)
+    for _ in range(min(k, len(pool))):
+        value = _pick(rng, pool)
+        chosen.append(value)
+        pool = [(v, w) for v, w in pool if v != value]
+    return chosen
+
+
+def _languages(rng: random.Random) -> list:
+    home = _pick(rng, list(STACK_WEIGHTS.items()))
+    n = rng.choices([1, 2, 3, 4, 5], weights=[10, 25, 30, 20, 15])[0]
+    langs = []
+    for _ in range(n):
+        # 75% from the home stack, the rest from anywhere
+        source = STACKS[home] if rng.random() < 0.75 else [l for l, _ in LANGUAGES]
+        lang = rng.choice(source)
+        if lang not in langs:
+            langs.append(lang)
+    return langs
+
+
+def make_builder(i: int, rng: random.Random) -> dict:
+    """One builder, shaped like a PROFILE_SELECT row (defaults applied)."""
+    languages = _languages(rng)
+    created = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=rng.randint(0, 400_000))
+    repos = [
+        {
+            "name": f"project-{i}-{j}",
+            "description": rng.choice(["", "side project", "hackathon entry", "a tool I needed"]),
+            "stars": int(rng.paretovariate(1.5)) - 1,
+            "language": rng.choice(languages),
+        }
+        for j in range(rng.randint(0, 5))
+    ]
+    return {
+        "username": f"builder_{i}",
+        "github_username": f"gh_builder_{i}",
+        "avatar": f"https://avatars.githubusercontent.com/u/{100000 + i}",
+        "bio": rng.choice(["", "Ships on weekends", "Backend person learning design",
+                           "ML engineer by day", "Building in public"]),
+        "building_style": _pick(rng, BUILDING_STYLES),
+        "interests": _sample(rng, INTERESTS, rng.randint(1, 4)),
+        "open_to": _sample(rng, [("weekend projects", 3), ("hackathons", 3), ("startups", 2),
+                                 ("open source", 2)], rng.randint(0, 2)),
+        "availability": _pick(rng, AVAILABILITY),
+        "current_idea": rng.choice([None, None, "AI study buddy", "open-source CI dashboard",
+                                    "climate data API", "indie game"]),
+        "city": _pick(rng, CITIES),
+        "github_languages": languages,
+        "github_repos": repos,
+        "total_stars": sum(r["stars"] for r in repos),
+        "public_repos": rng.randint(len(repos), 120),
+        "learning": _sample(rng, LEARNING, rng.randint(0, 3)),
+        "experience_level": _pick(rng, EXPERIENCE),
+        "looking_for": _pick(rng, LOOKING_FOR),
+        "created_at": created,
+        "updated_at": created + timedelta(days=rng.randint(0, 60)),
+    }
+
+
+def make_builders(n: int, seed: int = 42, start: int = 0) -> list:
+    rng = random.Random(seed + start)
+    return [make_builder(i, rng) for i in range(start, start + n)]
+
+
+def iter_builders(n: int, seed: int = 42, chunk: int = 10_000):
+    """Stream builders in chunks (for seeding millions without holding them all)."""
+    for start in range(0, n, chunk):
+        yield from make_builders(min(chunk, n - start), seed, start)
@@ -5,13 +5,13 @@ Fallback: Pure algorithm (zero cost, same output shape)
 Security: No secrets logged, safe error handling
 """
 
-from google import genai
 import os
 import json
 import math
 import random
 import hashlib
 from dotenv import load_dotenv
+from metrics import span
 
 load_dotenv()
 
@@ -47,6 +47,9 @@ def _get_categories(languages: list[str]) -> set[str]:
 _gemini_client = None
 _gemini_available = None  # None = untested, True/False = tested
 
+# Point the SDK somewhere other than Google (the load-test fake in loadtest/fakes.py)
+GEMINI_BASE_URL = os.environ.get("GEMINI_BASE_URL", "").strip()
+
 def _get_gemini_client():
     """
     Returns Gemini client or None — never raises.
@@ -64,7 +67,9 @@ def _get_gemini_client():
 
     try:
         if _gemini_client is None:
-            _gemini_client = genai.Client(api_key=api_key)
+            from google import genai  # ~0.5s of imports — deferred until Gemini is first needed
+            http_options = {"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None
+            _gemini_client = genai.Client(api_key=api_key, http_options=http_options)
         _gemini_available = True
         return _gemini_client
     except Exception as e:
@@ -74,6 +79,16 @@ def _get_gemini_client():
         return None
 
 
+def ai_enabled() -> bool:
+    """True unless Gemini is known to be unusable (no key, or client init failed)."""
+    return _gemini_available is not False and bool(os.environ.get("GOOGLE_API_KEY", "").strip())
+
+
+def warm_up():
+    """Import the SDK and build the client ahead of the first match (lifespan, in a thread)."""
+    _get_gemini_client()
+
+
 # ============================================
 # BIO GENERATION
 # ============================================
@@ -161,10 +176,11 @@ Write ONE sentence bio. Rules:
 Return ONLY the bio. No quotes, no extra text.
 """
         try:
-            response = client.models.generate_content(
-                model="gemini-2.0-flash-exp",
-                contents=prompt
-            )
+            with span("gemini"):
+                response = client.models.generate_content(
+                    model="gemini-2.0-flash-exp",
+                    contents=prompt
+                )
             bio = response.text.strip().strip('"').strip("'")
             if bio and len(bio) > 5:
                 return bio[:200]
@@ -334,20 +350,22 @@ def _algo_match(user1: dict, user2: dict, base_score: int) -> dict:
 # MAIN MATCH FUNCTION
 # ============================================
 
-def find_build_matches(user1: dict, user2: dict, local_only: bool = False) -> dict:
+def find_build_matches(user1: dict, user2: dict, local_only: bool = False, use_ai: bool = True) -> dict:
     """
     Match two builders.
     1. Calculate base score (always — your original algorithm)
-    2. Try Gemini for vibe + idea (if available)
+    2. Try Gemini for vibe + idea (if available and use_ai)
     3. Fall back to algorithm if Gemini fails or is unavailable
-    Same output shape either way.
+    Same output shape either way. With use_ai=True this blocks on the Gemini
+    call — async callers run it in a thread.
     """
-    base_score = calculate_skill_synergy(user1, user2)
+    with span("synergy"):
+        base_score = calculate_skill_synergy(user1, user2)
 
     if local_only and user1.get("city") != user2.get("city"):
         base_score = 0
 
-    client = _get_gemini_client()
+    client = _get_gemini_client() if use_ai else None
 
     if client:
         prompt = f"""
@@ -381,10 +399,11 @@ Return ONLY valid JSON (no markdown, no extra text):
 }}
 """
         try:
-            response = client.models.generate_content(
-                model="gemini-2.0-flash-exp",
-                contents=prompt
-            )
+            with span("gemini"):
+                response = client.models.generate_content(
+                    model="gemini-2.0-flash-exp",
+                    contents=prompt
+                )
             text = response.text.strip()
 
             # Strip markdown fences if present
@@ -0,0 +1,386 @@
+"""
+Partners - cache.py
+One cache interface for every app cache (sessions, profiles, communities,
+GitHub responses), over one of two backends:
+  - local: in-process LRU + TTL (default; each worker has its own)
+  - redis: shared by every worker/process — set CACHE_URL=redis://host:6379/0
+A Cache is a namespace with per-scope versions (bump a scope to invalidate
+every entry read under it) and a get_or_compute on top of singleflight.py, so
+concurrent misses for one key run the loader once.
+"""
+
+import os
+import time
+import pickle
+import asyncio
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+
+import orjson
+
+from singleflight import SingleFlight
+
+CACHE_URL           = os.environ.get("CACHE_URL", "").strip()
+CACHE_LOCAL_SIZE    = int(os.environ.get("CACHE_LOCAL_SIZE", 20000))
+# Writers evict in every worker (invalidation.py), so these TTLs are only a
+# safety net for writes made outside the app (SQL console, scripts)
+SESSION_CACHE_TTL   = float(os.environ.get("SESSION_CACHE_TTL", 3600))
+PROFILE_CACHE_TTL   = float(os.environ.get("PROFILE_CACHE_TTL", 3600))
+FOLLOWS_CACHE_TTL   = float(os.environ.get("FOLLOWS_CACHE_TTL", 3600))
+# Member lists embed member profiles, which change without a join — keep this short
+COMMUNITY_CACHE_TTL = float(os.environ.get("COMMUNITY_CACHE_TTL", 60))
+# Stored ETag/body per GitHub URL, in front of the github_cache table
+GITHUB_CACHE_TTL    = float(os.environ.get("GITHUB_CACHE_TTL", 3600))
+
+
+# ============================================
+# BACKENDS
+# ============================================
+
+class LocalBackend:
+    """In-process LRU with per-key TTL. Thread-safe (DB writers run in threads)."""
+    shared = False
+
+    def __init__(self, maxsize: int = CACHE_LOCAL_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._counters = {}             # scope versions — outside the LRU so never evicted
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisBackend:
+    """
+    Shared backend over the Redis protocol. Pass `client` to use any redis-py
+    compatible client (fakeredis in tests); otherwise one is built from `url`.
+    Values are pickled — the cache only ever holds our own objects.
+    Blocking: every call is a synchronous round trip (up to the 0.5s socket
+    timeout). Async code goes through Cache.aget/aset/get_or_compute, which
+    run it in a worker thread; DB writers already run in threads.
+    """
+    shared = True
+
+    def __init__(self, url: str = None, client=None, prefix: str = "partners:"):
+        if client is None:
+            import redis  # only needed when CACHE_URL points at Redis
+            client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value, ttl: float):
+        self.client.set(self.prefix + key, pickle.dumps(value), px=max(1, int(ttl * 1000)))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def get_counter(self, key: str) -> int:
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self.prefix + key))
+
+    def delete_prefix(self, prefix: str, batch: int = 500):
+        # UNLINK frees values in the background; one pipelined round trip per batch of keys
+        keys = []
+        for key in self.client.scan_iter(match=self.prefix + prefix + "*", count=batch):
+            keys.append(key)
+            if len(keys) >= batch:
+                self._unlink(keys)
+                keys = []
+        if keys:
+            self._unlink(keys)
+
+    def _unlink(self, keys: list):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.unlink(*keys)
+        pipe.execute()
+
+    def clear(self):
+        self.delete_prefix("")
+
+
+def make_backend(url: str = CACHE_URL):
+    """redis://, rediss:// or unix:// → RedisBackend; anything else → LocalBackend."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    return LocalBackend()
+
+
+# ============================================
+# CACHE
+# ============================================
+
+class Cache:
+    """
+    A namespace on a backend.
+      get / set / delete(key)        plain entries (delete_many for a batch)
+      version(scope) / bump(scope)   entries stored with a scope are keyed by its
+                                     current version, so bump() retires them all
+      get_or_compute(key, loader)    read-through; concurrent misses share one load
+      aget / aset                    get / set for async code: off the loop when the
+                                     backend is shared (a network round trip)
+      generation()                   taken before a DB read and passed to set(); a
+                                     delete()/clear() since then drops the write. On a
+                                     shared backend the counter lives there too, so a
+                                     delete() in any worker counts
+    Backend errors are logged and count as misses — a cache never fails a request.
+    Single-flight is per process; across workers the backend is the shared layer.
+    """
+
+    def __init__(self, namespace: str, ttl: float, backend=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend = backend
+        self._flights = SingleFlight(f"cache:{namespace}")
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    def _backend(self):
+        return self.backend if self.backend is not None else default_backend
+
+    @property
+    def shared(self) -> bool:
+        """True when every worker sees the same entries (no cross-worker eviction needed)."""
+        return self._backend().shared
+
+    def _key(self, key: str, scope: str = None) -> str:
+        if scope is None:
+            return f"{self.namespace}:{key}"
+        return f"{self.namespace}:{key}@{scope}.{self.version(scope)}"
+
+    def version(self, scope: str) -> int:
+        try:
+            return self._backend().get_counter(f"__version:{self.namespace}:{scope}")
+        except Exception as e:
+            self._error(e)
+            return -1
+
+    def bump(self, scope: str):
+        try:
+            self._backend().incr(f"__version:{self.namespace}:{scope}")
+        except Exception as e:
+            self._error(e)
+
+    def generation(self) -> int:
+        """Take before reading the DB; pass to set() so a read that raced a delete() is dropped."""
+        if not self.shared:
+            with self._lock:
+                return self._generation
+        try:
+            return self._backend().get_counter(f"__generation:{self.namespace}")
+        except Exception as e:
+            self._error(e)
+            return -1
+
+    def _next_generation(self):
+        with self._lock:
+            self._generation += 1
+        if self.shared:
+            try:
+                self._backend().incr(f"__generation:{self.namespace}")
+            except Exception as e:
+                self._error(e)
+
+    def get(self, key: str, scope: str = None):
+        try:
+            value = self._backend().get(self._key(key, scope))
+        except Exception as e:
+            self._error(e)
+            value = None
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key: str, value, ttl: float = None, scope: str = None, generation: int = None):
+        if generation is None:
+            self._store(self._key(key, scope), value, ttl)
+        else:
+            self._store_if_current(self._key(key, scope), value, ttl, generation)
+
+    async def _off_loop(self, fn, *args, **kwargs):
+        if self.shared:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    async def aget(self, key: str, scope: str = None):
+        return await self._off_loop(self.get, key, scope)
+
+    async def aset(self, key: str, value, ttl: float = None, scope: str = None, generation: int = None):
+        await self._off_loop(self.set, key, value, ttl, scope, generation)
+
+    async def ageneration(self) -> int:
+        return await self._off_loop(self.generation)
+
+    def delete(self, key: str):
+        self._next_generation()
+        try:
+            self._backend().delete(self._key(key))
+        except Exception as e:
+            self._error(e)
+
+    def delete_many(self, keys):
+        """delete() for a batch of keys, with one generation bump for all of them."""
+        self._next_generation()
+        for key in keys:
+            try:
+                self._backend().delete(self._key(key))
+            except Exception as e:
+                self._error(e)
+
+    def clear(self):
+        """Drop every entry in this namespace (scope versions are kept, so they only move forward)."""
+        self._next_generation()
+        try:
+            self._backend().delete_prefix(f"{self.namespace}:")
+        except Exception as e:
+            self._error(e)
+
+    async def get_or_compute(self, key: str, loader, ttl: float = None, scope: str = None):
+        """
+        Cached value for `key`, or the result of `loader()` — run once for all
+        concurrent callers (sync loaders in a worker thread). None is not cached;
+        exceptions reach every waiter.
+        """
+        value = await self.aget(key, scope)
+        if value is not None:
+            return value
+
+        full_key = await self._off_loop(self._key, key, scope)
+        if full_key in self._flights:
+            self.stats["coalesced"] += 1
+
+        async def load():
+            generation = await self.ageneration()
+            if inspect.iscoroutinefunction(loader):
+                value = await loader()
+            else:
+                value = await asyncio.to_thread(loader)
+            if value is not None:
+                await self._off_loop(self._store_if_current, full_key, value, ttl, generation)
+            return value
+
+        return await self._flights.do(full_key, load)
+
+    def _store(self, full_key: str, value, ttl: float = None):
+        try:
+            self._backend().set(full_key, value, self.ttl if ttl is None else ttl)
+        except Exception as e:
+            self._error(e)
+
+    def _store_if_current(self, full_key: str, value, ttl: float, generation: int):
+        if generation != self.generation():
+            return
+        self._store(full_key, value, ttl)
+        # Another worker's delete() can land between the check and the write: undo it
+        if self.shared and generation != self.generation():
+            try:
+                self._backend().delete(full_key)
+            except Exception as e:
+                self._error(e)
+
+    def _error(self, e: Exception):
+        self.stats["errors"] += 1
+        print(f"[cache] {self.namespace}: {type(e).__name__}: {e}")
+
+
+# ============================================
+# CACHED RESPONSE BODIES
+# ============================================
+
+class CachedBody:
+    """
+    A pre-encoded JSON body + strong ETag. `row` optionally keeps the source
+    row for server-side use (a profile's email for match notifications).
+    """
+    __slots__ = ("body", "etag", "row")
+
+    def __init__(self, payload, row: dict = None):
+        self.body = orjson.dumps(payload)
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        self.row = row
+
+    def __getstate__(self):
+        return (self.body, self.etag, self.row)
+
+    def __setstate__(self, state):
+        self.body, self.etag, self.row = state
+
+
+def profile_body(row) -> CachedBody:
+    """Profile entry: public JSON body; the full row (with email) kept for server use."""
+    row = dict(row)
+    public = {k: v for k, v in row.items() if k not in ('password', 'email')}
+    return CachedBody(public, row)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """RFC 9110 weak comparison for If-None-Match (list, W/ prefixes, *)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# ============================================
+# APP CACHES
+# ============================================
+
+default_backend = make_backend()
+
+sessions    = Cache("sessions", ttl=SESSION_CACHE_TTL)        # session_id → username
+profiles    = Cache("profiles", ttl=PROFILE_CACHE_TTL)        # username → CachedBody (row incl. email)
+follows     = Cache("follows", ttl=FOLLOWS_CACHE_TTL)         # username → usernames they follow
+communities = Cache("communities", ttl=COMMUNITY_CACHE_TTL)   # listing / member lists → CachedBody
+github      = Cache("github", ttl=GITHUB_CACHE_TTL)           # API url → github_cache row
+
+ALL_CACHES = (sessions, profiles, follows, communities, github)
@@ -2,26 +2,15 @@ import os
 import psycopg2
 from psycopg2.extras import RealDictCursor, register_default_jsonb
 from dotenv import load_dotenv
-import bcrypt
 from typing import List
-
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its bcrypt hash."""
-    if not hashed_password:
-        return False
-    if not (hashed_password.startswith('$2b$') or hashed_password.startswith('$2a$')):
-        # Not a bcrypt hash — reject. Run migration to rehash legacy accounts.
-        print("[auth] WARNING: plain-text password detected for a user — login blocked until rehashed")
-        return False
-    try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-    except Exception:
-        return False
+from cache import (
+    sessions as session_cache,
+    profiles as profile_cache,
+    follows as follows_cache,
+    communities as community_cache,
+)
+from invalidation import publish, evict_profile
+from metrics import span
 
 load_dotenv()
 
@@ -42,24 +31,299 @@ if _RAW_URL.startswith("postgres://"):
 else:
     DB_URL = _RAW_URL
 
-def get_db_conn():
+def get_db_conn(**options):
     # Supabase/Postgres usually requires SSL
     conn_url = DB_URL
     if "sslmode" not in conn_url:
         separator = "&" if "?" in conn_url else "?"
         conn_url += f"{separator}sslmode=require"
     
-    return psycopg2.connect(conn_url, cursor_factory=RealDictCursor)
+    return psycopg2.connect(conn_url, cursor_factory=ProfilingCursor, **options)
 
+import re
+import time
 import contextlib
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+# ============================================
+# QUERY PROFILER
+# ============================================
+
+# QUERY_PROFILER=1: every request gets an X-Query-Profile header and flagged requests are logged;
+# QUERY_PROFILER=verbose logs every request. query_profile() works regardless (tests).
+QUERY_PROFILER = os.environ.get("QUERY_PROFILER", "").strip().lower()
+QUERY_BUDGET   = int(os.environ.get("QUERY_BUDGET", 5))   # statements per request before it is flagged
+
+_active_profile = ContextVar("query_profile", default=None)
+
+_PARAM_RE   = re.compile(r"%(?:\(\w+\))?s")
+_STRING_RE  = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE  = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST_RE    = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+_SPACE_RE   = re.compile(r"\s+")
+
+
+def normalize_sql(query) -> str:
+    """Statement shape: literals and placeholders become ?, value lists collapse to (...)."""
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    query = _PARAM_RE.sub("?", query)
+    query = _STRING_RE.sub("?", query)
+    query = _NUMBER_RE.sub("?", query)
+    query = _LIST_RE.sub("(...)", query)
+    return _SPACE_RE.sub(" ", query).strip()
+
+
+class QueryProfile:
+    """Statements run while this profile was active: (normalized_sql, seconds, rowcount)."""
+
+    def __init__(self, budget: int = QUERY_BUDGET):
+        self.budget = budget
+        self.queries = []
+
+    def record(self, query, seconds: float, rows: int):
+        self.queries.append((normalize_sql(query), seconds, rows))
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(seconds for _, seconds, _ in self.queries) * 1000
+
+    def repeated(self) -> dict:
+        """Statements issued more than once — the N+1 signature."""
+        return {sql: n for sql, n in Counter(sql for sql, _, _ in self.queries).items() if n > 1}
+
+    @property
+    def flagged(self) -> bool:
+        return self.count > self.budget or bool(self.repeated())
+
+    def header(self) -> str:
+        return (f"count={self.count}; time={self.total_ms:.1f}ms; "
+                f"repeated={sum(self.repeated().values())}; budget={self.budget}")
+
+    def summary(self, label: str = "") -> str:
+        lines = [f"[queries] {label} {self.count} statement(s), {self.total_ms:.1f}ms"
+                 + (f" — over budget ({self.budget})" if self.count > self.budget else "")]
+        for sql, n in self.repeated().items():
+            lines.append(f"[queries]   N+1? x{n}: {sql[:160]}")
+        if QUERY_PROFILER == "verbose":
+            for sql, seconds, rows in self.queries:
+                lines.append(f"[queries]   {seconds * 1000:7.2f}ms {rows:>5} rows  {sql[:120]}")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def query_profile(budget: int = QUERY_BUDGET):
+    """
+    Record every statement run in this context (threads started with
+    asyncio.to_thread included):
+        with query_profile() as qp:
+            get_follow_stats("alice")
+        assert qp.count == 1
+    """
+    profile = QueryProfile(budget)
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+
+class ProfilingCursor(RealDictCursor):
+    """RealDictCursor that reports to the active query_profile(); one ContextVar read otherwise."""
+
+    def execute(self, query, vars=None):
+        profile = _active_profile.get()
+        if profile is None:
+            return super().execute(query, vars)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            profile.record(query, time.perf_counter() - started, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        profile = _active_profile.get()
+        if profile is None:
+            return super().executemany(query, vars_list)
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            profile.record(query, time.perf_counter() - started, self.rowcount)
+
+
+class QueryProfilerMiddleware:
+    """ASGI middleware (added only when QUERY_PROFILER is set): per-request profile → header + log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with query_profile() as profile:
+            async def send_with_header(message):
+                if message["type"] == "http.response.start":
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"x-query-profile", profile.header().encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_header)
+
+        if profile.flagged or QUERY_PROFILER == "verbose":
+            route = getattr(scope.get("route"), "path", scope["path"])
+            print(profile.summary(f"{scope['method']} {route}:"))
+
+# ============================================
+# CONNECTION POOL (one per worker process)
+# ============================================
+
+DB_POOL_MIN     = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX     = int(os.environ.get("DB_POOL_MAX", 10))
+# How long a request waits for a free connection before erroring
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+
+_pool = None
+_pool_pid = None
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_pool_lock = threading.Lock()
+
+
+def open_pool():
+    """Create this process's pool. Called from the lifespan; db_session() also opens it lazily."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            return _pool
+        # A pool inherited across fork() shares sockets with the parent — never reuse it
+        conn_url = DB_URL
+        if "sslmode" not in conn_url:
+            separator = "&" if "?" in conn_url else "?"
+            conn_url += f"{separator}sslmode=require"
+        _pool = ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, conn_url, cursor_factory=ProfilingCursor)
+        _pool_pid = os.getpid()
+        return _pool
+
+
+def close_pool():
+    """Shutdown: close every pooled connection (after background workers have drained)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool, _pool_pid = None, None
+
 
 @contextlib.contextmanager
 def db_session():
+    """
+    Borrow a pooled connection. Whatever the caller left uncommitted is rolled
+    back on return; broken connections are discarded instead of reused.
+    """
+    with span("db_pool"):
+        if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+            raise psycopg2.pool.PoolError(f"no free DB connection after {DB_POOL_TIMEOUT}s")
+    try:
+        pool = open_pool()
+        conn = pool.getconn()
+        try:
+            with span("db"):
+                yield conn
+        finally:
+            broken = bool(conn.closed)
+            if not broken and conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            pool.putconn(conn, close=broken)
+    finally:
+        _pool_slots.release()
+
+
+# ============================================
+# ADVISORY LOCKS (cross-worker coordination)
+# ============================================
+
+def _lock_key(name: str) -> int:
+    import hashlib
+    return int.from_bytes(hashlib.sha1(name.encode()).digest()[:8], "big", signed=True)
+
+
+@contextlib.contextmanager
+def advisory_lock(name: str):
+    """Hold a session-level advisory lock on a dedicated connection; waits for other holders."""
     conn = get_db_conn()
     try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (_lock_key(name),))
         yield conn
     finally:
-        conn.close()
+        conn.close()  # closing the session releases the lock
+
+
+def try_advisory_lock(name: str):
+    """
+    Non-blocking leader election: returns a connection holding the lock, or None
+    if another worker has it. Close the connection to step down.
+    """
+    conn = get_db_conn()
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s) AS ok", (_lock_key(name),))
+        if cur.fetchone()['ok']:
+            return conn
+    conn.close()
+    return None
+
+# Public profile projection — every builders column except password/email
+PROFILE_COLUMNS = (
+    "username", "github_username", "avatar", "bio", "building_style",
+    "interests", "open_to", "availability", "current_idea", "city",
+    "github_languages", "github_repos", "total_stars", "public_repos",
+    "learning", "experience_level", "looking_for", "created_at", "updated_at",
+)
+
+# The same projection with defaults applied in SQL, so rows can go straight
+# to JSON without a Python normalisation pass (see main._json_response).
+PROFILE_SELECT = """
+    b.username,
+    b.github_username,
+    COALESCE(NULLIF(b.avatar, ''), 'https://api.dicebear.com/7.x/avataaars/svg?seed=' || b.username) AS avatar,
+    COALESCE(b.bio, '')                        AS bio,
+    COALESCE(b.building_style, 'figures_it_out') AS building_style,
+    COALESCE(b.interests, '{}')                AS interests,
+    COALESCE(b.open_to, '{}')                  AS open_to,
+    COALESCE(b.availability, 'open')           AS availability,
+    b.current_idea,
+    b.city,
+    COALESCE(b.github_languages, '{}')         AS github_languages,
+    CASE WHEN jsonb_typeof(b.github_repos) = 'array'
+         THEN b.github_repos ELSE '[]'::jsonb END AS github_repos,
+    COALESCE(b.total_stars, 0)                 AS total_stars,
+    COALESCE(b.public_repos, 0)                AS public_repos,
+    COALESCE(b.learning, '{}')                 AS learning,
+    COALESCE(b.experience_level, 'intermediate') AS experience_level,
+    COALESCE(b.looking_for, 'build_partner')   AS looking_for,
+    COALESCE(b.created_at, NOW())              AS created_at,
+    COALESCE(b.updated_at, NOW())              AS updated_at
+"""
+
+# Columns a builder may change through /profile/update
+UPDATABLE_PROFILE_FIELDS = (
+    "building_style", "interests", "open_to", "availability", "current_idea",
+    "city", "email", "learning", "experience_level", "looking_for",
+)
 
 # Helper for builders
 def get_builders():
@@ -68,13 +332,27 @@ def get_builders():
             cur.execute("SELECT * FROM builders")
             return cur.fetchall()
 
+def get_builder_profiles():
+    """Every builder as a public profile (PROFILE_SELECT) — no password/email."""
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {PROFILE_SELECT} FROM builders b")
+            return cur.fetchall()
+
+def get_builder_profile(username: str):
+    """Public profile projection plus email (needed server-side for notifications)."""
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {PROFILE_SELECT}, b.email FROM builders b WHERE b.username = %s", (username,))
+            return cur.fetchone()
+
 def get_builder_by_username(username: str):
     with db_session() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT * FROM builders WHERE username = %s", (username,))
             return cur.fetchone()
 
-def upsert_builder(builder_data: dict):
+def _upsert_builder(cur, builder_data: dict):
     # Convert lists/dicts to JSON for postgres
     import json
     data = builder_data.copy()
@@ -98,25 +376,58 @@ def upsert_builder(builder_data: dict):
         VALUES ({placeholders})
         ON CONFLICT (username) DO UPDATE SET {update_clause}
     """
-    
+    cur.execute(query, values)
+
+def upsert_builder(builder_data: dict):
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            _upsert_builder(cur, builder_data)
+            publish(cur, "profile", builder_data['username'])
+        conn.commit()
+    profile_cache.delete(builder_data['username'])
+
+def update_builder_by_session(session_id: str, fields: dict, columns=PROFILE_COLUMNS):
+    """
+    Apply a partial profile update for the session's builder in one round trip:
+    UPDATE only the changed columns, joined to the session lookup, RETURNING the
+    profile projection. Returns None if the session is unknown.
+    """
+    changed = [col for col in UPDATABLE_PROFILE_FIELDS if col in fields]
+    set_clause = ", ".join([f"{col} = %({col})s" for col in changed] + ["updated_at = NOW()"])
+    returning = ", ".join(f"b.{col}" for col in columns)
+    query = f"""
+        UPDATE builders AS b SET {set_clause}
+        FROM sessions s
+        WHERE s.session_id = %(session_id)s AND b.username = s.username
+        RETURNING {returning}
+    """
+    params = {col: fields[col] for col in changed}
+    params["session_id"] = session_id
     with db_session() as conn:
         with conn.cursor() as cur:
-            cur.execute(query, values)
+            cur.execute(query, params)
+            row = cur.fetchone()
+            if row is not None:
+                publish(cur, "profile", row['username'], row.get('updated_at'))
         conn.commit()
+    if row is not None:
+        profile_cache.delete(row['username'])
+    return row
 
-def create_follows_table():
-    sql = """
-    CREATE TABLE IF NOT EXISTS follows (
-        follower_username VARCHAR(255) REFERENCES builders(username) ON DELETE CASCADE,
-        following_username VARCHAR(255) REFERENCES builders(username) ON DELETE CASCADE,
-        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-        PRIMARY KEY (follower_username, following_username)
-    );
+def register_builder(builder_data: dict, session_id: str, outbox_email: dict = None):
+    """
+    Create the builder, their first session and (optionally) the welcome email
+    in a single transaction — the email exists only if the account does.
     """
     with db_session() as conn:
         with conn.cursor() as cur:
-            cur.execute(sql)
+            _upsert_builder(cur, builder_data)
+            _save_session(cur, session_id, builder_data['username'])
+            if outbox_email:
+                _insert_outbox(cur, **outbox_email)
+            publish(cur, "profile", builder_data['username'])
         conn.commit()
+    profile_cache.delete(builder_data['username'])
 
 def toggle_follow(follower: str, following: str) -> bool:
     """Returns True if followed, False if unfollowed."""
@@ -130,17 +441,25 @@ def toggle_follow(follower: str, following: str) -> bool:
             else:
                 cur.execute("INSERT INTO follows (follower_username, following_username) VALUES (%s, %s)", (follower, following))
                 following_status = True
+            publish(cur, "follow", follower)
         conn.commit()
-        return following_status
+    follows_cache.delete(follower)
+    return following_status
 
-def get_follow_stats(username: str):
+def get_follow_stats(username: str, viewer: str = None):
+    """Follower/following counts, and whether `viewer` follows `username` — one statement."""
     with db_session() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT count(*) as count FROM follows WHERE following_username = %s", (username,))
-            followers = cur.fetchone()['count']
-            cur.execute("SELECT count(*) as count FROM follows WHERE follower_username = %s", (username,))
-            following = cur.fetchone()['count']
-            return {"followers": followers, "following": following}
+            cur.execute("""
+                SELECT
+                    (SELECT count(*) FROM follows WHERE following_username = %(u)s) AS followers,
+                    (SELECT count(*) FROM follows WHERE follower_username = %(u)s)  AS following,
+                    EXISTS (SELECT 1 FROM follows
+                            WHERE follower_username = %(v)s AND following_username = %(u)s) AS is_following
+            """, {"u": username, "v": viewer})
+            row = cur.fetchone()
+            return {"followers": row['followers'], "following": row['following'],
+                    "is_following": bool(viewer) and row['is_following']}
 
 def is_following(follower: str, following: str) -> bool:
     if not follower or not following: return False
@@ -149,15 +468,24 @@ def is_following(follower: str, following: str) -> bool:
             cur.execute("SELECT 1 FROM follows WHERE follower_username = %s AND following_username = %s", (follower, following))
             return bool(cur.fetchone())
 
+def update_password(username: str, hashed_password: str):
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE builders SET password = %s WHERE username = %s", (hashed_password, username))
+        conn.commit()
+
 # Helper for sessions
+def _save_session(cur, session_id: str, username: str):
+    cur.execute("""
+        INSERT INTO sessions (session_id, username)
+        VALUES (%s, %s)
+        ON CONFLICT (session_id) DO NOTHING
+    """, (session_id, username))
+
 def save_session(session_id: str, username: str):
     with db_session() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO sessions (session_id, username)
-                VALUES (%s, %s)
-                ON CONFLICT (session_id) DO NOTHING
-            """, (session_id, username))
+            _save_session(cur, session_id, username)
         conn.commit()
 
 def get_session_username(session_id: str):
@@ -167,20 +495,43 @@ def get_session_username(session_id: str):
             res = cur.fetchone()
             return res['username'] if res else None
 
+def get_session_builder(session_id: str):
+    """
+    Resolve a session straight to its builder (one sessions JOIN builders query).
+    Same shape as get_builder_profile, so the row can seed the profile cache.
+    """
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT {PROFILE_SELECT}, b.email
+                FROM sessions s
+                JOIN builders b ON b.username = s.username
+                WHERE s.session_id = %s
+            """, (session_id,))
+            return cur.fetchone()
+
 def delete_session(session_id: str):
     """Delete a specific session row (used by /logout)."""
     with db_session() as conn:
         with conn.cursor() as cur:
             cur.execute("DELETE FROM sessions WHERE session_id = %s", (session_id,))
+            publish(cur, "session", session_id)
         conn.commit()
+    session_cache.delete(session_id)
 
-def delete_expired_sessions(days=30):
+def delete_expired_sessions(days=30) -> int:
     from datetime import datetime, timedelta
     cutoff = datetime.now() - timedelta(days=days)
     with db_session() as conn:
         with conn.cursor() as cur:
-            cur.execute("DELETE FROM sessions WHERE created_at < %s", (cutoff,))
+            cur.execute("DELETE FROM sessions WHERE created_at < %s RETURNING session_id", (cutoff,))
+            expired = [r['session_id'] for r in cur.fetchall()]
+            # One event per 100 ids (~4KB payload), not one NOTIFY per session
+            for i in range(0, len(expired), 100):
+                publish(cur, "session", expired[i:i + 100])
         conn.commit()
+    session_cache.delete_many(expired)
+    return len(expired)
 
 # Helper for communities
 def create_community(name: str, description: str, host_username: str = None, type: str = 'general'):
@@ -192,29 +543,53 @@ def create_community(name: str, description: str, host_username: str = None, typ
                 RETURNING id
             """, (name, description, host_username, type))
             res = cur.fetchone()
+            publish(cur, "communities", "*")
             conn.commit()
-            return res['id']
+    community_cache.bump("communities")
+    return res['id']
 
 def get_communities():
+    # members_count is trigger-maintained (migrations/0006_community_members_count.sql)
     with db_session() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT c.*, (SELECT count(*) FROM community_members cm WHERE cm.community_id = c.id) as members_count
-                FROM communities c
-                ORDER BY c.created_at DESC
-            """)
+            cur.execute("SELECT c.* FROM communities c ORDER BY c.created_at DESC")
             return cur.fetchall()
 
 def get_community_by_id(community_id: str):
     with db_session() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT c.*, (SELECT count(*) FROM community_members cm WHERE cm.community_id = c.id) as members_count
-                FROM communities c
-                WHERE c.id = %s
-            """, (community_id,))
+            cur.execute("SELECT c.* FROM communities c WHERE c.id = %s", (community_id,))
             return cur.fetchone()
 
+def reconcile_members_count():
+    """
+    Backfill / repair communities.members_count from community_members.
+    Returns the rows that were out of step (id, name, old, new).
+    """
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            # Lock first, count after: the trigger's increments wait for us, and
+            # the count below (a new snapshot) sees every join committed before
+            # the lock — otherwise one landing mid-UPDATE is overwritten
+            cur.execute("SELECT id FROM communities ORDER BY id FOR UPDATE")
+            cur.execute("""
+                UPDATE communities c
+                SET members_count = actual.n
+                FROM (
+                    SELECT c2.id, c2.members_count AS old, count(cm.username) AS n
+                    FROM communities c2
+                    LEFT JOIN community_members cm ON cm.community_id = c2.id
+                    GROUP BY c2.id
+                ) actual
+                WHERE c.id = actual.id AND c.members_count IS DISTINCT FROM actual.n
+                RETURNING c.id, c.name, actual.old, actual.n AS new
+            """)
+            fixed = cur.fetchall()
+            publish(cur, "communities", "*")
+        conn.commit()
+    community_cache.bump("communities")
+    return fixed
+
 def join_community(community_id: str, username: str):
     with db_session() as conn:
         with conn.cursor() as cur:
@@ -223,7 +598,10 @@ def join_community(community_id: str, username: str):
                 VALUES (%s, %s)
                 ON CONFLICT DO NOTHING
             """, (community_id, username))
+            publish(cur, "community", community_id)
         conn.commit()
+    community_cache.bump("communities")
+    community_cache.bump(f"community:{community_id}")
 
 def get_community_members(community_id: str):
     with db_session() as conn:
@@ -235,6 +613,16 @@ def get_community_members(community_id: str):
             """, (community_id,))
             return cur.fetchall()
 
+def get_community_member_profiles(community_id: str):
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT {PROFILE_SELECT} FROM builders b
+                JOIN community_members cm ON b.username = cm.username
+                WHERE cm.community_id = %s
+            """, (community_id,))
+            return cur.fetchall()
+
 def get_user_communities(username: str):
     with db_session() as conn:
         with conn.cursor() as cur:
@@ -250,3 +638,258 @@ def get_following_list(username: str) -> list[str]:
         with conn.cursor() as cur:
             cur.execute("SELECT following_username FROM follows WHERE follower_username = %s", (username,))
             return [row['following_username'] for row in cur.fetchall()]
+
+
+# Helper for the GitHub profile refresher
+def get_builders_to_refresh(limit: int, max_age_hours: int = 24, active_days: int = 14):
+    """
+    Builders whose GitHub data is older than max_age_hours and who are not
+    backing off after a failed refresh (mark_github_sync_failed).
+    Active users (a session in the last active_days) first, then oldest data first.
+    """
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT b.username, b.github_username
+                FROM builders b
+                LEFT JOIN (
+                    SELECT username, max(created_at) AS last_seen
+                    FROM sessions
+                    GROUP BY username
+                ) s ON s.username = b.username
+                WHERE (b.github_synced_at IS NULL
+                       OR b.github_synced_at < NOW() - make_interval(hours => %s))
+                  AND (b.github_sync_retry_at IS NULL OR b.github_sync_retry_at <= NOW())
+                ORDER BY COALESCE(s.last_seen > NOW() - make_interval(days => %s), false) DESC,
+                         b.github_synced_at ASC NULLS FIRST
+                LIMIT %s
+            """, (max_age_hours, active_days, limit))
+            return cur.fetchall()
+
+def update_github_data_batch(rows: List[dict]):
+    """
+    Write refreshed GitHub data for many builders in one statement.
+    updated_at only moves when the GitHub data actually changed.
+    """
+    import json
+    from psycopg2.extras import execute_values
+    if not rows:
+        return
+    values = [
+        (
+            r['username'], r['avatar'], r['github_languages'],
+            json.dumps(r['github_repos']), r['total_stars'], r['public_repos'],
+        )
+        for r in rows
+    ]
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            updated = execute_values(cur, """
+                UPDATE builders AS b SET
+                    avatar           = v.avatar,
+                    github_languages = v.github_languages::text[],
+                    github_repos     = v.github_repos::jsonb,
+                    total_stars      = v.total_stars,
+                    public_repos     = v.public_repos,
+                    github_synced_at = NOW(),
+                    github_sync_failures = 0,
+                    github_sync_retry_at = NULL,
+                    updated_at = CASE
+                        WHEN (b.avatar, b.github_languages, b.github_repos, b.total_stars, b.public_repos)
+                             IS DISTINCT FROM
+                             (v.avatar, v.github_languages::text[], v.github_repos::jsonb, v.total_stars, v.public_repos)
+                        THEN NOW() ELSE b.updated_at END
+                FROM (VALUES %s) AS v(username, avatar, github_languages, github_repos, total_stars, public_repos)
+                WHERE b.username = v.username
+                RETURNING b.username, b.updated_at
+            """, values, fetch=True)
+            # Unchanged GitHub data keeps its updated_at, so cached copies survive
+            for r in updated:
+                publish(cur, "profile", r['username'], r['updated_at'])
+        conn.commit()
+    for r in updated:
+        evict_profile(r['username'], r['updated_at'])
+
+def mark_github_synced(usernames: List[str]):
+    """Push back builders whose GitHub account is gone so they don't block the queue."""
+    if not usernames:
+        return
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE builders SET github_synced_at = NOW() WHERE username = ANY(%s)", (usernames,))
+        conn.commit()
+
+def mark_github_sync_failed(usernames: List[str], base_seconds: float, max_seconds: float):
+    """
+    Count a failed refresh and hold the builder out of the queue for
+    base_seconds * 2^(failures - 1), capped at max_seconds — repeated failures
+    stop spending the rate budget at the head of the queue.
+    """
+    if not usernames:
+        return
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE builders SET
+                    github_sync_failures = github_sync_failures + 1,
+                    github_sync_retry_at = NOW() + make_interval(
+                        secs => LEAST(%s, %s * power(2, LEAST(github_sync_failures, 20)))
+                    )
+                WHERE username = ANY(%s)
+            """, (max_seconds, base_seconds, usernames))
+        conn.commit()
+
+# Helper for the GitHub response cache
+def get_github_cache(url: str):
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT url, etag, last_modified, body, fetched_at FROM github_cache WHERE url = %s", (url,))
+            return cur.fetchone()
+
+def save_github_cache(url: str, etag: str, last_modified: str, body):
+    import json
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO github_cache (url, etag, last_modified, body, fetched_at)
+                VALUES (%s, %s, %s, %s, NOW())
+                ON CONFLICT (url) DO UPDATE SET
+                    etag = EXCLUDED.etag,
+                    last_modified = EXCLUDED.last_modified,
+                    body = EXCLUDED.body,
+                    fetched_at = NOW()
+            """, (url, etag, last_modified, json.dumps(body)))
+        conn.commit()
+
+def touch_github_cache(url: str):
+    """Mark a cached response as revalidated (GitHub answered 304)."""
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute("UPDATE github_cache SET fetched_at = NOW() WHERE url = %s", (url,))
+        conn.commit()
+
+# Helper for the email outbox
+def _insert_outbox(cur, kind: str, to_email: str, payload: dict):
+    import json
+    cur.execute("""
+        INSERT INTO email_outbox (kind, to_email, payload)
+        VALUES (%s, %s, %s)
+    """, (kind, to_email, json.dumps(payload)))
+
+def enqueue_outbox_email(kind: str, to_email: str, payload: dict):
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            _insert_outbox(cur, kind, to_email, payload)
+        conn.commit()
+
+def enqueue_match_check(to_email: str, check: dict, window_seconds: float, dedupe_seconds: float) -> bool:
+    """
+    Queue one chemistry check for the recipient's next digest.
+    - The same (from, to) check is skipped if one was delivered within dedupe_seconds,
+      and replaces the pending one (latest score wins) if it hasn't gone out yet.
+    - All pending checks for a recipient share one send time, so they go out as one digest.
+    Returns False when the check was deduplicated against a recent delivery.
+    """
+    import json
+    dedupe_key = f"match:{check['from_username']}:{check['to_username']}"
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO email_outbox (kind, to_email, payload, dedupe_key, next_attempt_at)
+                SELECT 'match', %(to)s, %(payload)s, %(key)s, COALESCE(
+                    (SELECT min(next_attempt_at) FROM email_outbox
+                     WHERE kind = 'match' AND to_email = %(to)s AND status = 'pending'),
+                    NOW() + make_interval(secs => %(window)s)
+                )
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM email_outbox
+                    WHERE dedupe_key = %(key)s AND status IN ('sending', 'delivered')
+                      AND created_at > NOW() - make_interval(secs => %(dedupe)s)
+                )
+                ON CONFLICT (dedupe_key) WHERE status = 'pending'
+                DO UPDATE SET payload = EXCLUDED.payload
+                RETURNING id
+            """, {
+                "to": to_email, "payload": json.dumps(check), "key": dedupe_key,
+                "window": window_seconds, "dedupe": dedupe_seconds,
+            })
+            queued = cur.fetchone() is not None
+        conn.commit()
+        return queued
+
+def claim_outbox_batch(limit: int, lease_seconds: int = 300):
+    """
+    Claim every due email for up to `limit` recipients for this worker.
+    Recipients are claimed whole — a transaction-scoped advisory lock per
+    recipient keeps two workers from splitting one recipient's rows, so a
+    digest is never sent in pieces. SKIP LOCKED and the lock let any number of
+    workers claim in parallel without overlap; rows stuck in 'sending' past the
+    lease (crashed worker) are reclaimed.
+    """
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                WITH due AS MATERIALIZED (
+                    SELECT to_email, min(next_attempt_at) AS due_at FROM email_outbox
+                    WHERE (status = 'pending' AND next_attempt_at <= NOW())
+                       OR (status = 'sending' AND locked_at < NOW() - make_interval(secs => %(lease)s))
+                    GROUP BY to_email
+                    ORDER BY due_at, to_email
+                ), recipients AS (
+                    -- MATERIALIZED keeps the lock call above the sort: locks are taken
+                    -- in due order and stop at the limit
+                    SELECT to_email FROM due
+                    WHERE pg_try_advisory_xact_lock(hashtextextended('partners:outbox:' || to_email, 0))
+                    LIMIT %(limit)s
+                )
+                UPDATE email_outbox SET
+                    status = 'sending',
+                    locked_at = NOW(),
+                    attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE to_email IN (SELECT to_email FROM recipients)
+                      AND ((status = 'pending' AND next_attempt_at <= NOW())
+                        OR (status = 'sending' AND locked_at < NOW() - make_interval(secs => %(lease)s)))
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, kind, to_email, payload, attempts
+            """, {"lease": lease_seconds, "limit": limit})
+            rows = cur.fetchall()
+        conn.commit()
+        return rows
+
+def mark_outbox_delivered(outbox_ids: List[int]):
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE email_outbox
+                SET status = 'delivered', delivered_at = NOW(), locked_at = NULL, last_error = NULL
+                WHERE id = ANY(%s)
+            """, (outbox_ids,))
+        conn.commit()
+
+def mark_outbox_failed(outbox_ids: List[int], error: str, retry_in_seconds: float = None):
+    """Schedule a retry after retry_in_seconds, or give up when it is None."""
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            if retry_in_seconds is None:
+                cur.execute("""
+                    UPDATE email_outbox
+                    SET status = 'failed', locked_at = NULL, last_error = %s
+                    WHERE id = ANY(%s)
+                """, (error, outbox_ids))
+            else:
+                cur.execute("""
+                    UPDATE email_outbox
+                    SET status = 'pending', locked_at = NULL, last_error = %s,
+                        next_attempt_at = NOW() + make_interval(secs => %s)
+                    WHERE id = ANY(%s)
+                """, (error, retry_in_seconds, outbox_ids))
+        conn.commit()
+
+def count_pending_outbox() -> int:
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) AS count FROM email_outbox WHERE status IN ('pending', 'sending')")
+            return cur.fetchone()['count']
@@ -0,0 +1,234 @@
+"""
+Partners - email_dispatcher.py
+Email delivery from the durable `email_outbox` table.
+Handlers write the email into the outbox (in the same transaction as the
+action that triggered it) and return; worker loops claim batches with
+FOR UPDATE SKIP LOCKED, send them through Resend and mark them delivered or
+failed. Any number of workers — in this process or others — can drain the
+outbox in parallel without double-sending, and nothing is lost on redeploy.
+
+Chemistry checks are coalesced per recipient: repeated (from, to) checks are
+deduplicated, and checks arriving within EMAIL_DIGEST_WINDOW go out as one digest.
+"""
+
+import os
+import time
+import random
+import asyncio
+from emails import deliver, build_match_digest, email_enabled
+from database import (
+    enqueue_outbox_email,
+    enqueue_match_check,
+    claim_outbox_batch,
+    mark_outbox_delivered,
+    mark_outbox_failed,
+    count_pending_outbox,
+)
+
+EMAIL_WORKERS       = int(os.environ.get("EMAIL_WORKERS", 2))
+EMAIL_BATCH_SIZE    = int(os.environ.get("EMAIL_BATCH_SIZE", 10))       # recipients per claim (all their due rows)
+EMAIL_MAX_ATTEMPTS  = int(os.environ.get("EMAIL_MAX_ATTEMPTS", 5))
+EMAIL_BACKOFF_BASE  = float(os.environ.get("EMAIL_BACKOFF_BASE", 2.0))     # seconds; doubles per attempt
+EMAIL_POLL_INTERVAL = float(os.environ.get("EMAIL_POLL_INTERVAL", 5.0))    # idle poll when nobody nudges us
+EMAIL_LEASE_SECONDS = int(os.environ.get("EMAIL_LEASE_SECONDS", 300))      # reclaim rows from crashed workers
+# Checks for one recipient within this window share a digest. Kept under the
+# 30s email KPI (ARCHITECTURE.md, KPI 3) — raise it to coalesce harder.
+EMAIL_DIGEST_WINDOW = float(os.environ.get("EMAIL_DIGEST_WINDOW", 20.0))
+EMAIL_DEDUPE_WINDOW = float(os.environ.get("EMAIL_DEDUPE_WINDOW", 3600.0))  # same (from, to) again → no email
+EMAIL_SEND_RATE     = float(os.environ.get("EMAIL_SEND_RATE", 2.0))        # Resend calls/sec per process; 0 = unlimited
+
+
+def outbox_enabled() -> bool:
+    """Only write outbox rows we can actually send."""
+    return email_enabled()
+
+
+def outbox_row(kind: str, payload: dict) -> dict:
+    """Shape a rendered Resend payload for database.register_builder(outbox_email=...)."""
+    return {"kind": kind, "to_email": payload["to"], "payload": payload}
+
+
+class _SendRate:
+    """Spaces Resend calls at most `rate` per second across all workers in this process."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = None
+
+    async def wait(self):
+        if not self.interval:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+class EmailDispatcher:
+    def __init__(
+        self,
+        workers: int = EMAIL_WORKERS,
+        batch_size: int = EMAIL_BATCH_SIZE,
+        send_rate: float = EMAIL_SEND_RATE,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self._rate = _SendRate(send_rate)
+        self._wakeup = None
+        self._stop = None
+        self._tasks = []
+        self.stats = {"queued": 0, "deduped": 0, "sent": 0, "coalesced": 0, "retried": 0, "failed": 0, "errors": 0}
+
+    def depth(self) -> int:
+        """Emails waiting in the outbox (all workers, all processes)."""
+        return count_pending_outbox()
+
+    async def start(self):
+        """Spin up the worker loops. Call once per process, inside the running loop."""
+        if self._tasks:
+            return
+        if not outbox_enabled():
+            # Nothing is ever queued without a Resend key — don't poll the outbox for it
+            print("[email] RESEND_API_KEY not set — outbox workers not started")
+            return
+        self._wakeup = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    def notify(self):
+        """Nudge idle workers after a commit that added outbox rows."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def enqueue(self, kind: str, payload: dict) -> bool:
+        """Write a standalone email to the outbox. Blocking DB call — returns once committed."""
+        if not outbox_enabled():
+            print("[email] RESEND_API_KEY not set — skipping")
+            return False
+        enqueue_outbox_email(kind, payload["to"], payload)
+        self.stats["queued"] += 1
+        self.notify()
+        return True
+
+    def enqueue_match_check(
+        self,
+        to_email: str,
+        to_username: str,
+        from_username: str,
+        from_avatar: str,
+        chemistry_score: int,
+        vibe: str,
+        why: str,
+        build_idea: str,
+    ) -> bool:
+        """Queue a chemistry check for the target's next digest. Blocking DB call."""
+        if not outbox_enabled():
+            print("[email] RESEND_API_KEY not set — skipping")
+            return False
+        check = {
+            "to_username": to_username,
+            "from_username": from_username,
+            "from_avatar": from_avatar,
+            "chemistry_score": chemistry_score,
+            "vibe": vibe,
+            "why": why,
+            "build_idea": build_idea,
+        }
+        if not enqueue_match_check(to_email, check, EMAIL_DIGEST_WINDOW, EMAIL_DEDUPE_WINDOW):
+            self.stats["deduped"] += 1
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    @staticmethod
+    def _group(batch: list) -> list:
+        """One outgoing email per welcome row; one digest per match recipient."""
+        digests, groups = {}, []
+        for row in batch:
+            if row['kind'] != 'match':
+                groups.append([row])
+            elif row['to_email'] in digests:
+                digests[row['to_email']].append(row)
+            else:
+                digests[row['to_email']] = [row]
+                groups.append(digests[row['to_email']])
+        return groups
+
+    async def _send(self, rows: list):
+        ids = [r['id'] for r in rows]
+        first = rows[0]
+        if first['kind'] == 'match':
+            payload = build_match_digest(
+                first['to_email'], first['payload']['to_username'], [r['payload'] for r in rows]
+            )
+            label = f"match digest #{first['id']} ({len(rows)} checks)"
+        else:
+            payload = first['payload']
+            label = f"{first['kind']} email #{first['id']}"
+        attempts = max(r['attempts'] for r in rows)
+
+        await self._rate.wait()
+        try:
+            await asyncio.to_thread(deliver, payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:500]
+            if attempts >= EMAIL_MAX_ATTEMPTS:
+                self.stats["failed"] += 1
+                print(f"[email] Giving up on {label} after {attempts} attempts: {error}")
+                await asyncio.to_thread(mark_outbox_failed, ids, error, None)
+            else:
+                self.stats["retried"] += 1
+                delay = EMAIL_BACKOFF_BASE * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+                await asyncio.to_thread(mark_outbox_failed, ids, error, delay)
+            return
+        self.stats["sent"] += 1
+        self.stats["coalesced"] += len(rows) - 1
+        print(f"[email] Sent {label}")
+        await asyncio.to_thread(mark_outbox_delivered, ids)
+
+    async def _worker(self, n: int):
+        while not self._stop.is_set():
+            try:
+                batch = await asyncio.to_thread(claim_outbox_batch, self.batch_size, EMAIL_LEASE_SECONDS)
+            except Exception as e:
+                print(f"[email] Worker {n} claim failed: {type(e).__name__}")
+                batch = []
+
+            for rows in self._group(batch):
+                try:
+                    await self._send(rows)
+                except Exception as e:
+                    # Rendering or outbox bookkeeping failed. Keep the worker alive;
+                    # the rows stay claimed and are retried once their lease expires.
+                    self.stats["errors"] += 1
+                    print(f"[email] Worker {n} failed on #{rows[0]['id']}: {type(e).__name__}: {e}")
+
+            if len(batch) < self.batch_size:
+                # Outbox drained — sleep until a handler nudges us or the poll interval passes
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=EMAIL_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain(self, timeout: float = 20.0):
+        """
+        Shutdown: let workers finish the batch they hold, then stop.
+        Anything still pending stays in the outbox for the next process.
+        """
+        if not self._tasks:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+dispatcher = EmailDispatcher()
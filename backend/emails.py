@@ -1,13 +1,15 @@
 """
 Partners - emails.py
-Handles all transactional emails via Resend.
-Fails silently — email should never break the main flow.
+Builds the transactional emails and delivers them via Resend. Sending goes
+through the outbox (email_dispatcher.py) — email should never break the main flow.
 """
 
 import os
-import resend
+from metrics import span
 
-resend.api_key = os.environ.get("RESEND_API_KEY", "")
+RESEND_API_KEY = os.environ.get("RESEND_API_KEY", "")
+# Override for local fakes (loadtest); None keeps the SDK default
+RESEND_API_URL = os.environ.get("RESEND_API_URL")
 
 FROM_ADDRESS = "onboarding@resend.dev"
 APP_URL = os.environ.get("APP_URL", "https://partners1.vercel.app")
@@ -67,7 +69,37 @@ def _base_template(content: str) -> str:
     """
 
 
-def send_match_notification(
+_resend = None
+
+
+def email_enabled() -> bool:
+    return bool(RESEND_API_KEY)
+
+
+def _resend_sdk():
+    """The resend SDK, imported on first send (it pulls in requests)."""
+    global _resend
+    if _resend is None:
+        import resend
+        resend.api_key = RESEND_API_KEY
+        if RESEND_API_URL:
+            resend.api_url = RESEND_API_URL
+        _resend = resend
+    return _resend
+
+
+def warm_up():
+    if email_enabled():
+        _resend_sdk()
+
+
+def deliver(payload: dict):
+    """Send a rendered email through Resend. Raises on failure — callers decide on retries."""
+    with span("email"):
+        _resend_sdk().Emails.send(payload)
+
+
+def build_match_notification(
     to_email: str,
     to_username: str,
     from_username: str,
@@ -76,15 +108,8 @@ def send_match_notification(
     vibe: str,
     why: str,
     build_idea: str,
-) -> bool:
-    """
-    Notify a builder that someone checked their chemistry.
-    Returns True if sent, False if failed.
-    """
-    if not resend.api_key:
-        print("[email] RESEND_API_KEY not set — skipping")
-        return False
-
+) -> dict:
+    """Render the chemistry-check email. Returns a Resend payload."""
     score_color = VIBE_COLORS.get(vibe, "#00FF41")
 
     # Score bar width
@@ -178,25 +203,97 @@ def send_match_notification(
     </tr>
     """
 
-    try:
-        resend.Emails.send({
-            "from": FROM_ADDRESS,
-            "to": to_email,
-            "subject": f"⚡ @{from_username} checked your chemistry — {chemistry_score}% match",
-            "html": _base_template(content),
-        })
-        print(f"[email] Match notification sent to {to_username}")
-        return True
-    except Exception as e:
-        print(f"[email] Failed to send match notification: {type(e).__name__}: {e}")
-        return False
-
-
-def send_welcome_email(to_email: str, to_username: str) -> bool:
-    """Send welcome email after registration."""
-    if not resend.api_key:
-        return False
+    return {
+        "from": FROM_ADDRESS,
+        "to": to_email,
+        "subject": f"⚡ @{from_username} checked your chemistry — {chemistry_score}% match",
+        "html": _base_template(content),
+    }
+
+
+def build_match_digest(to_email: str, to_username: str, checks: list) -> dict:
+    """
+    Render several chemistry checks for one recipient as a single email.
+    `checks` are build_match_notification kwargs minus to_email; one check
+    renders as the regular notification.
+    """
+    if len(checks) == 1:
+        return build_match_notification(to_email=to_email, **checks[0])
+
+    checks = sorted(checks, key=lambda c: c["chemistry_score"], reverse=True)
+    rows = ""
+    for check in checks:
+        score_color = VIBE_COLORS.get(check["vibe"], "#00FF41")
+        rows += f"""
+    <tr>
+      <td style="background:#0D1525;border:1px solid #1E293B;border-radius:16px;padding:20px 24px;">
+        <table width="100%" cellpadding="0" cellspacing="0">
+          <tr>
+            <td>
+              <p style="color:#FFFFFF;font-size:16px;font-weight:900;margin:0 0 4px;">@{check["from_username"]}</p>
+              <p style="color:{score_color};font-size:12px;margin:0 0 12px;">{check["chemistry_score"]}% · {check["vibe"]}</p>
+              <p style="color:#CBD5E1;font-size:13px;margin:0;line-height:1.6;">
+                <span style="color:{score_color};">&gt;</span> {check["why"]}
+              </p>
+            </td>
+          </tr>
+        </table>
+      </td>
+    </tr>
+
+    <tr><td style="height:12px;"></td></tr>
+    """
+
+    content = f"""
+    <tr>
+      <td style="padding-bottom:32px;">
+        <p style="color:#64748B;font-size:11px;margin:0 0 16px;letter-spacing:3px;text-transform:uppercase;">
+          Chemistry_Digest
+        </p>
+        <h1 style="color:#FFFFFF;font-size:28px;margin:0 0 8px;font-weight:900;line-height:1.2;">
+          {len(checks)} builders checked<br/>their chemistry with you
+        </h1>
+      </td>
+    </tr>
+
+    {rows}
+
+    <tr><td style="height:20px;"></td></tr>
+
+    <!-- CTA -->
+    <tr>
+      <td align="center">
+        <a href="{APP_URL}"
+           style="display:inline-block;background:#00FF41;color:#060A14;font-size:12px;
+                  font-weight:900;letter-spacing:3px;text-decoration:none;
+                  padding:16px 32px;border-radius:12px;text-transform:uppercase;">
+          VIEW_THEIR_PROFILES
+        </a>
+      </td>
+    </tr>
+
+    <tr><td style="height:24px;"></td></tr>
+
+    <tr>
+      <td align="center">
+        <p style="color:#334155;font-size:11px;margin:0;">
+          @{to_username} · builders checked your chemistry on Partners
+        </p>
+      </td>
+    </tr>
+    """
+
+    top = checks[0]
+    return {
+        "from": FROM_ADDRESS,
+        "to": to_email,
+        "subject": f"⚡ {len(checks)} builders checked your chemistry — top match @{top['from_username']} ({top['chemistry_score']}%)",
+        "html": _base_template(content),
+    }
+
 
+def build_welcome_email(to_email: str, to_username: str) -> dict:
+    """Render the welcome email. Returns a Resend payload."""
     content = f"""
     <tr>
       <td style="padding-bottom:32px;">
@@ -257,15 +354,9 @@ def send_welcome_email(to_email: str, to_username: str) -> bool:
     </tr>
     """
 
-    try:
-        resend.Emails.send({
-            "from": FROM_ADDRESS,
-            "to": to_email,
-            "subject": "⚡ You're in — Partners",
-            "html": _base_template(content),
-        })
-        print(f"[email] Welcome email sent to {to_username}")
-        return True
-    except Exception as e:
-        print(f"[email] Failed to send welcome email: {type(e).__name__}: {e}")
-        return False
+    return {
+        "from": FROM_ADDRESS,
+        "to": to_email,
+        "subject": "⚡ You're in — Partners",
+        "html": _base_template(content),
+    }
@@ -0,0 +1,207 @@
+"""
+Partners - github_api.py
+GitHub REST client with a conditional-request (ETag) cache.
+Every response is stored by URL with its ETag / Last-Modified, and refreshes
+send If-None-Match. GitHub does not charge 304 Not Modified against the rate limit.
+The github_cache table is read through cache.github, so hot URLs skip the DB.
+"""
+
+from __future__ import annotations
+
+import os
+import asyncio
+from fastapi import HTTPException
+from cache import github as response_cache
+from database import get_github_cache, save_github_cache, touch_github_cache
+from metrics import span
+from singleflight import SingleFlight
+
+GITHUB_API = os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+# Last rate-limit window GitHub reported (X-RateLimit-* headers).
+# remaining/reset stay None until the first response comes back.
+rate_limit = {"remaining": None, "limit": None, "reset": None}
+
+# One pooled client per worker process, opened/closed by main.lifespan
+_client = None
+
+# Concurrent fetches of one GitHub user (register retries, refresher overlap) share the calls
+fetches = SingleFlight("fetch_github_data")
+
+
+async def open_client():
+    global _client
+    if _client is None:
+        import httpx  # imported here so the app module loads without it
+        _client = httpx.AsyncClient(timeout=10.0)
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _headers() -> dict:
+    headers = {"Accept": "application/vnd.github.v3+json"}
+    github_token = os.environ.get("GITHUB_TOKEN")
+    if github_token:
+        headers["Authorization"] = f"token {github_token}"
+    return headers
+
+
+def _record_rate_limit(res: httpx.Response):
+    try:
+        if "X-RateLimit-Remaining" in res.headers:
+            rate_limit["remaining"] = int(res.headers["X-RateLimit-Remaining"])
+        if "X-RateLimit-Limit" in res.headers:
+            rate_limit["limit"] = int(res.headers["X-RateLimit-Limit"])
+        if "X-RateLimit-Reset" in res.headers:
+            rate_limit["reset"] = int(res.headers["X-RateLimit-Reset"])
+    except ValueError:
+        pass
+
+
+# ============================================
+# CONDITIONAL GET
+# ============================================
+
+async def cached_get(client: httpx.AsyncClient, url: str, serve_stale: bool = True) -> tuple[int, object]:
+    """
+    GET a GitHub URL through the ETag cache.
+    Returns (status_code, json_body). A 304 is returned as 200 with the cached body.
+    If GitHub errors but we hold a cached copy, the stale copy is served instead,
+    unless serve_stale=False (the refresher must see the error to back off).
+    """
+    try:
+        cached = await response_cache.get_or_compute(url, lambda: get_github_cache(url))
+    except Exception as e:
+        print(f"[github] Cache read failed: {type(e).__name__}")
+        cached = None
+
+    headers = _headers()
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    with span("github"):
+        res = await client.get(url, headers=headers, timeout=10.0)
+    _record_rate_limit(res)
+
+    if res.status_code == 304 and cached:
+        try:
+            await asyncio.to_thread(touch_github_cache, url)
+        except Exception:
+            pass
+        return 200, cached["body"]
+
+    if res.status_code == 200:
+        body = res.json()
+        etag, last_modified = res.headers.get("ETag"), res.headers.get("Last-Modified")
+        await response_cache.aset(url, {"url": url, "etag": etag, "last_modified": last_modified, "body": body})
+        try:
+            await asyncio.to_thread(save_github_cache, url, etag, last_modified, body)
+        except Exception as e:
+            print(f"[github] Cache write failed: {type(e).__name__}")
+        return 200, body
+
+    if cached and serve_stale and res.status_code != 404:
+        print(f"[github] {res.status_code} from GitHub — serving cached copy")
+        return 200, cached["body"]
+
+    return res.status_code, None
+
+
+# ============================================
+# PROFILE FETCH
+# ============================================
+
+def _empty_github_data(github_username: str) -> dict:
+    return {
+        "github_username": github_username,
+        "avatar": f"https://github.com/{github_username}.png",
+        "bio": "",
+        "github_languages": [],
+        "github_repos": [],
+        "total_stars": 0,
+        "public_repos": 0
+    }
+
+
+async def fetch_github_data(
+    github_username: str,
+    client: httpx.AsyncClient = None,
+    fallback: bool = True,
+) -> dict:
+    """
+    Fetch a builder's GitHub profile + recent repos.
+    Uses the worker's shared client unless one is passed in.
+    fallback=False re-raises network errors instead of returning empty data
+    and never serves a stale cached copy (the background refresher must never
+    overwrite a profile with blanks, and must see GitHub errors to back off).
+    Concurrent calls for the same user and fallback share one fetch (and the
+    first caller's client); callers must copy the result before changing it.
+    """
+    async def fetch():
+        return await _fetch_github_data(github_username, client, fallback)
+
+    return await fetches.do((github_username.lower(), fallback), fetch)
+
+
+async def _fetch_github_data(github_username: str, client, fallback: bool) -> dict:
+    import httpx
+    try:
+        if client is None:
+            client = _client
+        if client is None:
+            async with httpx.AsyncClient() as own_client:
+                return await _fetch_github_data(github_username, own_client, fallback)
+
+        status, profile = await cached_get(client, f"{GITHUB_API}/users/{github_username}", serve_stale=fallback)
+        if status == 404:
+            raise HTTPException(status_code=404, detail=f"GitHub user '{github_username}' not found")
+        if status != 200:
+            raise HTTPException(status_code=500, detail="GitHub API error")
+
+        status, repos = await cached_get(
+            client, f"{GITHUB_API}/users/{github_username}/repos?sort=updated&per_page=10", serve_stale=fallback
+        )
+        if status != 200 and not fallback:
+            raise HTTPException(status_code=500, detail="GitHub API error")
+        repos = repos if status == 200 and isinstance(repos, list) else []
+
+        languages = {}
+        for repo_data in repos[:5]:
+            repo = repo_data if isinstance(repo_data, dict) else {}
+            lang = repo.get('language')
+            if lang:
+                languages[lang] = languages.get(lang, 0) + 1
+
+        return {
+            "github_username": github_username,
+            "avatar": profile.get("avatar_url", f"https://github.com/{github_username}.png"),
+            "bio": profile.get("bio", ""),
+            "github_languages": sorted(languages.keys(), key=languages.get, reverse=True)[:5],
+            "github_repos": [
+                {
+                    "name": r.get("name", "unknown"),
+                    "description": r.get("description", ""),
+                    "stars": r.get("stargazers_count", 0),
+                    "language": r.get("language", "")
+                }
+                for r in repos[:5]
+            ],
+            "total_stars": sum(
+                r.get("stargazers_count", 0) if isinstance(r, dict) else 0
+                for r in repos
+            ),
+            "public_repos": profile.get("public_repos", 0)
+        }
+    except httpx.HTTPError as e:
+        if not fallback:
+            raise
+        print(f"GitHub fetch error: {e}")
+        return _empty_github_data(github_username)
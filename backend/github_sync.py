@@ -0,0 +1,155 @@
+"""
+Partners - github_sync.py
+Background refresher for builders' GitHub data.
+github_languages / github_repos / total_stars are captured at /register and
+would otherwise go stale. This loop re-syncs them in priority order
+(active users first, oldest data first), paced by GitHub's rate-limit headers.
+With several workers, only the one holding the refresher advisory lock runs it.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import asyncio
+from fastapi import HTTPException
+import github_api
+from github_api import fetch_github_data
+from database import (
+    get_builders_to_refresh,
+    update_github_data_batch,
+    mark_github_synced,
+    mark_github_sync_failed,
+    try_advisory_lock,
+)
+
+SYNC_INTERVAL      = int(os.environ.get("GITHUB_SYNC_INTERVAL", 900))     # seconds between passes
+SYNC_MAX_AGE_HOURS = int(os.environ.get("GITHUB_SYNC_MAX_AGE_HOURS", 24))
+SYNC_BATCH         = int(os.environ.get("GITHUB_SYNC_BATCH", 50))
+SYNC_CONCURRENCY   = int(os.environ.get("GITHUB_SYNC_CONCURRENCY", 4))
+# Calls left untouched for /register — the refresher never dips below this
+RATE_LIMIT_RESERVE = int(os.environ.get("GITHUB_SYNC_RESERVE", 200))
+CALLS_PER_BUILDER  = 2  # /users/{u} + /users/{u}/repos
+# A failed refresh (GitHub 5xx, network) is retried after 15 min, doubling up to the max age
+RETRY_BASE_SECONDS = float(os.environ.get("GITHUB_SYNC_RETRY_BASE", 900))
+
+
+def sync_enabled() -> bool:
+    """On by default when a GITHUB_TOKEN is set (60 req/h unauthenticated is too little)."""
+    flag = os.environ.get("GITHUB_SYNC", "auto").lower()
+    if flag == "auto":
+        return bool(os.environ.get("GITHUB_TOKEN"))
+    return flag in ("1", "true", "yes", "on")
+
+
+def _budget() -> int:
+    """How many builders we can refresh right now without eating the reserve."""
+    remaining = github_api.rate_limit["remaining"]
+    reset = github_api.rate_limit["reset"]
+    if remaining is None or (reset and reset <= time.time()):
+        # Nothing observed yet, or the window rolled over — probe with a small batch
+        return SYNC_CONCURRENCY
+    return max(0, (remaining - RATE_LIMIT_RESERVE) // CALLS_PER_BUILDER)
+
+
+def _seconds_until_reset() -> float:
+    reset = github_api.rate_limit["reset"]
+    if not reset:
+        return SYNC_INTERVAL
+    return max(1.0, reset - time.time() + 1)
+
+
+# ============================================
+# ONE PASS
+# ============================================
+
+async def refresh_batch(client: httpx.AsyncClient, limit: int) -> int:
+    """
+    Refresh up to `limit` stale builders. Returns how many were settled
+    (refreshed, marked gone, or put on retry backoff) — 0 means nothing to do
+    or no progress.
+    """
+    import httpx
+    builders = await asyncio.to_thread(get_builders_to_refresh, limit, SYNC_MAX_AGE_HOURS)
+    if not builders:
+        return 0
+
+    sem = asyncio.Semaphore(SYNC_CONCURRENCY)
+    refreshed, gone, failed = [], [], []
+
+    async def refresh_one(b):
+        async with sem:
+            # Re-check between calls — concurrent fetches share one budget
+            if _budget() <= 0:
+                return
+            try:
+                data = await fetch_github_data(b['github_username'], client, fallback=False)
+            except HTTPException as e:
+                (gone if e.status_code == 404 else failed).append(b['username'])
+                return
+            except httpx.HTTPError as e:
+                print(f"[github-sync] {b['username']}: {type(e).__name__}")
+                failed.append(b['username'])
+                return
+            refreshed.append({"username": b['username'], **data})
+
+    await asyncio.gather(*(refresh_one(b) for b in builders))
+
+    await asyncio.to_thread(update_github_data_batch, refreshed)
+    await asyncio.to_thread(mark_github_synced, gone)
+    await asyncio.to_thread(mark_github_sync_failed, failed, RETRY_BASE_SECONDS, SYNC_MAX_AGE_HOURS * 3600)
+    print(f"[github-sync] Refreshed {len(refreshed)}/{len(builders)} builders, {len(failed)} failed "
+          f"(rate limit remaining: {github_api.rate_limit['remaining']})")
+    return len(refreshed) + len(gone) + len(failed)
+
+
+# ============================================
+# BACKGROUND LOOP
+# ============================================
+
+def _still_leader(lock_conn) -> bool:
+    """The lock lives as long as its session — check the session is still up."""
+    try:
+        with lock_conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        return True
+    except Exception:
+        return False
+
+
+async def run_refresher(stop: asyncio.Event):
+    """
+    Loop until `stop` is set. One worker across all processes wins the lock and
+    refreshes; the others re-check every SYNC_INTERVAL in case the leader goes away.
+    Sleeps until the rate-limit reset when the budget runs out.
+    """
+    import httpx
+    lock_conn = None
+    async with httpx.AsyncClient() as client:
+        while not stop.is_set():
+            delay = SYNC_INTERVAL
+            try:
+                if lock_conn is not None and not await asyncio.to_thread(_still_leader, lock_conn):
+                    lock_conn.close()
+                    lock_conn = None
+                if lock_conn is None:
+                    lock_conn = await asyncio.to_thread(try_advisory_lock, "partners:github-sync")
+                if lock_conn is None:
+                    pass  # another worker is refreshing
+                elif (budget := _budget()) <= 0:
+                    delay = _seconds_until_reset()
+                    print(f"[github-sync] Rate-limit budget spent — pausing {int(delay)}s")
+                else:
+                    settled = await refresh_batch(client, min(SYNC_BATCH, budget))
+                    if settled:
+                        # More may be waiting — go again soon, but spread calls over the window
+                        delay = 1.0
+            except Exception as e:
+                print(f"[github-sync] Pass failed: {type(e).__name__}: {e}")
+
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+    if lock_conn is not None:
+        lock_conn.close()
@@ -0,0 +1,193 @@
+"""
+Partners - invalidation.py
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+Writers in database.py publish a compact {entity, key, version} event inside
+their own transaction — Postgres only delivers it if the write commits — and
+every worker runs listen(), which evicts the matching entries from its
+in-process caches. Shared (Redis) caches are skipped: the writer's own delete
+after commit removes the entry for everyone and bumps the backend's write
+generation, so a cold read racing it in any worker is not written back.
+"""
+
+import os
+import re
+import socket
+import asyncio
+from datetime import datetime
+
+import orjson
+import cache
+
+CHANNEL = os.environ.get("CACHE_NOTIFY_CHANNEL", "partners_cache")
+if not re.fullmatch(r"[a-z_][a-z0-9_]*", CHANNEL):
+    raise RuntimeError("CACHE_NOTIFY_CHANNEL must be a lowercase SQL identifier")
+
+KEEPALIVE_SECONDS = float(os.environ.get("CACHE_NOTIFY_KEEPALIVE", 30))
+# A keepalive round trip slower than this means the connection is dead — reconnect
+KEEPALIVE_TIMEOUT = float(os.environ.get("CACHE_NOTIFY_KEEPALIVE_TIMEOUT", 10))
+# TCP keepalives on the LISTEN connection: a half-open socket errors out in
+# about a minute instead of after the kernel's default two hours
+LISTEN_CONN_OPTIONS = {"keepalives": 1, "keepalives_idle": 30, "keepalives_interval": 10, "keepalives_count": 3}
+
+# Lets a worker skip the echo of its own writes (already evicted locally)
+ORIGIN = f"{socket.gethostname()}:{os.getpid()}"
+
+stats = {"published": 0, "received": 0, "applied": 0, "reconnects": 0}
+
+
+def _version(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+# ============================================
+# PUBLISH (inside the writer's transaction)
+# ============================================
+
+def publish(cur, entity: str, key, version=None):
+    """
+    Queue an event on the writer's cursor. NOTIFY is transactional: nothing is
+    sent on rollback, and listeners see it only after the data is committed.
+    `key` may be a list for batch evictions; keep it under NOTIFY's 8000-byte payload limit.
+    """
+    payload = {"entity": entity, "key": key, "origin": ORIGIN}
+    if version is not None:
+        payload["version"] = _version(version)
+    cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, orjson.dumps(payload).decode()))
+    stats["published"] += 1
+
+
+# ============================================
+# APPLY
+# ============================================
+
+def evict_profile(username: str, version=None):
+    """
+    Drop a cached profile unless the cached copy is already at `version`
+    (updated_at) or newer — e.g. a GitHub refresh that changed nothing.
+    """
+    version = _version(version)
+    if version is not None:
+        entry = cache.profiles.get(username)
+        cached_at = entry.row.get('updated_at') if entry is not None and entry.row else None
+        if cached_at is not None and _version(cached_at) >= version:
+            return
+    cache.profiles.delete(username)
+
+
+def _evict_community(key: str, version=None):
+    cache.communities.bump("communities")
+    cache.communities.bump(f"community:{key}")
+
+
+def _evict_sessions(key, version=None):
+    # A batch (expired-session cleanup) arrives as one event carrying a list of ids
+    session_ids = key if isinstance(key, list) else [key]
+    cache.sessions.delete_many([str(session_id) for session_id in session_ids])
+
+
+HANDLERS = {
+    "profile":     (cache.profiles, evict_profile),
+    "session":     (cache.sessions, _evict_sessions),
+    "follow":      (cache.follows, lambda key, version=None: cache.follows.delete(key)),
+    "community":   (cache.communities, _evict_community),
+    "communities": (cache.communities, lambda key, version=None: cache.communities.bump("communities")),
+}
+
+
+def apply(payload: str) -> bool:
+    """Evict what one NOTIFY payload names. Returns True if anything was evicted."""
+    stats["received"] += 1
+    try:
+        event = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        print(f"[invalidate] Bad payload: {payload[:100]!r}")
+        return False
+    if event.get("origin") == ORIGIN:
+        return False
+    handler = HANDLERS.get(event.get("entity"))
+    if handler is None:
+        return False
+    target, evict = handler
+    if target.shared:
+        return False   # the writer's delete() already reached every worker (see module docstring)
+    key = event.get("key")
+    evict(key if isinstance(key, list) else str(key), event.get("version"))
+    stats["applied"] += 1
+    return True
+
+
+def _forget_local():
+    """Events may have been missed while disconnected — drop every local entry."""
+    for c in cache.ALL_CACHES:
+        if not c.shared:
+            c.clear()
+
+
+# ============================================
+# LISTENER
+# ============================================
+
+def _connect():
+    from database import get_db_conn
+    conn = get_db_conn(**LISTEN_CONN_OPTIONS)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {CHANNEL}")
+    return conn
+
+
+def _ping(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1")
+
+
+async def _listen_once(conn, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    fd = conn.fileno()
+    loop.add_reader(fd, ready.set)
+    stopping = asyncio.ensure_future(stop.wait())
+    try:
+        while not stop.is_set():
+            woke = asyncio.ensure_future(ready.wait())
+            done, _ = await asyncio.wait(
+                {woke, stopping}, timeout=KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED
+            )
+            woke.cancel()
+            if not done:
+                # Quiet channel: a round trip proves the connection is still alive.
+                # Off the loop and with a deadline — on a half-open socket it would block.
+                await asyncio.wait_for(asyncio.to_thread(_ping, conn), KEEPALIVE_TIMEOUT)
+            ready.clear()
+            conn.poll()
+            while conn.notifies:
+                apply(conn.notifies.pop(0).payload)
+    finally:
+        stopping.cancel()
+        loop.remove_reader(fd)
+
+
+async def listen(stop: asyncio.Event):
+    """Worker task: LISTEN on CHANNEL until `stop` is set, reconnecting with backoff."""
+    backoff = 1.0
+    while not stop.is_set():
+        conn = None
+        try:
+            conn = await asyncio.to_thread(_connect)
+            _forget_local()
+            backoff = 1.0
+            await _listen_once(conn, stop)
+        except Exception as e:
+            stats["reconnects"] += 1
+            print(f"[invalidate] Listener lost ({type(e).__name__}: {e}) — reconnecting in {int(backoff)}s")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, 30.0)
+        finally:
+            if conn is not None:
+                # A timed-out ping may still hold the connection; close() waits for it, off the loop
+                await asyncio.to_thread(conn.close)
@@ -0,0 +1,224 @@
+"""
+Partners - loadtest/drive.py
+Closed-loop traffic driver: --users virtual users, each picking an endpoint
+from a weighted mix (MIXES), calling it, thinking, repeating. Reports
+throughput and P50/P95/P99 per endpoint and checks the ARCHITECTURE.md KPIs
+(chemistry check < 3s P95, registration < 5s P95); exits 1 if one is missed.
+
+    python loadtest/drive.py --base-url http://127.0.0.1:8000 --users 50 --duration 60 \\
+        --builders 10000 --sessions 1000 --mix browse --json results.json
+
+--builders/--sessions must match what loadtest/seed.py seeded.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+from seed import session_id, LOADTEST_PASSWORD
+
+# endpoint label → weight. Labels group requests whose path differs only by id.
+MIXES = {
+    # Typical day: mostly reading profiles and the feed, a few checks and writes
+    "browse": {
+        "discover": 30, "profile": 25, "profile_stats": 8, "following": 5, "communities": 8,
+        "community_members": 5, "match": 10, "profile_update": 4, "follow": 3, "join": 1, "register": 1,
+    },
+    # Launch-day spike: everyone runs chemistry checks and signs up
+    "match_heavy": {
+        "discover": 20, "profile": 15, "match": 45, "register": 10, "profile_update": 5, "follow": 5,
+    },
+    "read_only": {
+        "discover": 40, "profile": 35, "profile_stats": 10, "communities": 10, "community_members": 5,
+    },
+}
+
+KPIS = {"match": 3000.0, "register": 5000.0}  # P95 ms
+
+INTERESTS = ["ai_ml", "web", "devtools", "open_source", "games", "climate"]
+
+
+class Run:
+    def __init__(self, builders: int, sessions: int, seed: int):
+        self.builders = builders
+        self.sessions = sessions
+        self.rng = random.Random(seed)
+        self.latencies = defaultdict(list)   # label → [ms]
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.community_ids = []
+        self.registered = itertools.count()
+        self.run_id = f"{int(time.time()) % 100000:05d}"
+
+    def builder(self) -> str:
+        # Popular profiles get most of the views (Pareto over ids)
+        return f"builder_{min(self.builders - 1, int(self.rng.paretovariate(1.1)) - 1)}"
+
+    def any_builder(self) -> str:
+        return f"builder_{self.rng.randrange(self.builders)}"
+
+    def session(self) -> str:
+        return session_id(self.rng.randrange(self.sessions))
+
+    def request(self, label: str) -> tuple:
+        """(method, path, params, json) for one call of `label`."""
+        sid = self.session()
+        if label == "discover":
+            params = {"session_id": sid, "limit": 20}
+            if self.rng.random() < 0.3:
+                params["filter_interest"] = self.rng.choice(INTERESTS)
+            return "GET", "/discover", params, None
+        if label == "profile":
+            return "GET", f"/profile/{self.builder()}", None, None
+        if label == "profile_stats":
+            return "GET", f"/profile/{self.builder()}/stats", {"session_id": sid}, None
+        if label == "following":
+            return "GET", "/profile/following/list", {"session_id": sid}, None
+        if label == "communities":
+            return "GET", "/communities", None, None
+        if label == "community_members":
+            if not self.community_ids:
+                return "GET", "/communities", None, None
+            return "GET", f"/communities/{self.rng.choice(self.community_ids)}/members", None, None
+        if label == "match":
+            return "POST", f"/match/{self.any_builder()}", {"session_id": sid}, None
+        if label == "profile_update":
+            return "POST", "/profile/update", None, {
+                "session_id": sid,
+                "interests": self.rng.sample(INTERESTS, 2),
+                "availability": self.rng.choice(["open", "this_weekend", "this_month"]),
+            }
+        if label == "follow":
+            return "POST", f"/profile/{self.any_builder()}/follow", None, {"session_id": sid}
+        if label == "join":
+            if not self.community_ids:
+                return "GET", "/communities", None, None
+            return "POST", f"/communities/{self.rng.choice(self.community_ids)}/join", None, {"session_id": sid}
+        if label == "register":
+            n = next(self.registered)
+            return "POST", "/register", None, {
+                "username": f"lt_{self.run_id}_{n}",
+                "password": LOADTEST_PASSWORD,
+                "github_username": f"gh_lt_{self.run_id}_{n}",
+                "email": f"lt_{self.run_id}_{n}@loadtest.invalid",
+            }
+        raise ValueError(f"Unknown endpoint label {label!r}")
+
+
+async def user(client: httpx.AsyncClient, run: Run, mix: dict, deadline: float,
+               warmup_until: float, think_ms: float):
+    labels, weights = zip(*mix.items())
+    while time.monotonic() < deadline:
+        label = run.rng.choices(labels, weights=weights)[0]
+        method, path, params, body = run.request(label)
+        started = time.perf_counter()
+        try:
+            res = await client.request(method, path, params=params, json=body)
+            status = res.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if time.monotonic() >= warmup_until:
+            run.latencies[label].append(elapsed_ms)
+            run.statuses[label][status] += 1
+            if not isinstance(status, int) or status >= 400:
+                run.errors[label] += 1
+        if think_ms:
+            await asyncio.sleep(run.rng.expovariate(1000 / think_ms))
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))  # nearest rank
+    return sorted_values[k]
+
+
+def summarize(run: Run, seconds: float) -> dict:
+    report = {}
+    for label, values in sorted(run.latencies.items()):
+        values.sort()
+        report[label] = {
+            "count": len(values),
+            "errors": run.errors[label],
+            "rps": round(len(values) / seconds, 2),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+            "max_ms": round(values[-1], 1),
+            "statuses": {str(k): v for k, v in run.statuses[label].items()},
+        }
+    return report
+
+
+def print_report(report: dict, seconds: float):
+    total = sum(r["count"] for r in report.values())
+    print(f"\n{'endpoint':<18} {'count':>7} {'err':>5} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for label, r in report.items():
+        print(f"{label:<18} {r['count']:>7} {r['errors']:>5} {r['rps']:>7.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+    print(f"{'total':<18} {total:>7} {'':>5} {total / seconds:>7.1f}   (latencies in ms)")
+
+
+def check_kpis(report: dict) -> list:
+    misses = []
+    for label, budget in KPIS.items():
+        if label in report and report[label]["p95_ms"] > budget:
+            misses.append(f"{label} P95 {report[label]['p95_ms']:.0f}ms > {budget:.0f}ms")
+    return misses
+
+
+async def main(args) -> int:
+    mix = MIXES[args.mix]
+    run = Run(args.builders, args.sessions, args.seed)
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        res = await client.get("/communities")
+        res.raise_for_status()
+        run.community_ids = [c["id"] for c in res.json()]
+
+        start = time.monotonic()
+        warmup_until = start + args.warmup
+        deadline = warmup_until + args.duration
+        print(f"[drive] {args.users} users, mix={args.mix}, {args.warmup}s warm-up + {args.duration}s "
+              f"against {args.base_url}")
+        await asyncio.gather(*(
+            user(client, run, mix, deadline, warmup_until, args.think_ms) for _ in range(args.users)
+        ))
+
+    report = summarize(run, args.duration)
+    print_report(report, args.duration)
+    misses = check_kpis(report)
+    for miss in misses:
+        print(f"KPI MISSED: {miss}")
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"mix": args.mix, "users": args.users, "duration_s": args.duration,
+                       "builders": args.builders, "endpoints": report, "kpi_misses": misses}, f, indent=2)
+    return 1 if misses else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive a traffic mix against a running Partners API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="browse")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds first")
+    parser.add_argument("--think-ms", type=float, default=100, help="mean pause between a user's calls")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--builders", type=int, default=10_000)
+    parser.add_argument("--sessions", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_out")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,215 @@
+"""
+Partners - loadtest/fakes.py
+Local stand-ins for the external services, on one port:
+  /github/...   GitHub REST (users, repos) with ETags and rate-limit headers
+  /gemini/...   Gemini generateContent (match JSON or a one-line bio)
+  /resend/...   Resend POST /emails
+Each service gets a median latency (log-normal jitter) and an error rate, set
+on the command line or changed at runtime with POST /__config.
+
+    python loadtest/fakes.py --port 9100 --latency gemini=800,github=150,resend=120 --errors gemini=0.02
+
+Point the app at it:
+    GITHUB_API_URL=http://127.0.0.1:9100/github
+    GEMINI_BASE_URL=http://127.0.0.1:9100/gemini   GOOGLE_API_KEY=fake
+    RESEND_API_URL=http://127.0.0.1:9100/resend    RESEND_API_KEY=fake
+"""
+
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import argparse
+
+from fastapi import FastAPI, Request, Response
+
+SERVICES = ("github", "gemini", "resend")
+
+# Status returned on an injected error — what each real service sends when it is struggling
+ERROR_STATUS = {"github": 502, "gemini": 503, "resend": 500}
+
+config = {
+    "latency_ms": {"github": 150.0, "gemini": 800.0, "resend": 120.0},
+    "jitter":     0.35,   # sigma of the log-normal around the median
+    "error_rate": {"github": 0.0, "gemini": 0.0, "resend": 0.0},
+}
+stats = {s: {"requests": 0, "errors": 0, "not_modified": 0} for s in SERVICES}
+
+app = FastAPI(title="Partners load-test fakes")
+
+
+async def _behave(service: str):
+    """Sleep for this service's latency; return an error Response if one is injected."""
+    stats[service]["requests"] += 1
+    median = config["latency_ms"][service]
+    if median > 0:
+        await asyncio.sleep(median * math.exp(random.gauss(0, config["jitter"])) / 1000)
+    if random.random() < config["error_rate"][service]:
+        stats[service]["errors"] += 1
+        return Response(status_code=ERROR_STATUS[service], content=b'{"message":"injected error"}',
+                        media_type="application/json")
+    return None
+
+
+def _json(payload, status: int = 200, headers: dict = None) -> Response:
+    return Response(content=json.dumps(payload), status_code=status,
+                    media_type="application/json", headers=headers)
+
+
+# ============================================
+# GITHUB
+# ============================================
+
+GITHUB_LANGUAGES = ["Python", "TypeScript", "JavaScript", "Go", "Rust", "Java", "Swift", "Kotlin", None]
+
+
+def _seeded(username: str) -> random.Random:
+    # Same user → same data → same ETag, so conditional requests can come back 304
+    return random.Random(hashlib.sha1(username.encode()).hexdigest())
+
+
+def _github_response(request: Request, payload) -> Response:
+    body = json.dumps(payload).encode()
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = {
+        "ETag": etag,
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Remaining": "4999",
+        "X-RateLimit-Reset": str(int(time.time()) + 3600),
+    }
+    if request.headers.get("if-none-match") == etag:
+        stats["github"]["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/github/users/{username}")
+async def github_user(username: str, request: Request):
+    if (error := await _behave("github")) is not None:
+        return error
+    if username.startswith("missing_"):
+        return _json({"message": "Not Found"}, 404)
+    rng = _seeded(username)
+    return _github_response(request, {
+        "login": username,
+        "avatar_url": f"https://avatars.githubusercontent.com/u/{rng.randint(1, 10**8)}",
+        "bio": rng.choice(["", "Building things on weekends", "Backend by day, games by night"]),
+        "public_repos": rng.randint(0, 80),
+    })
+
+
+@app.get("/github/users/{username}/repos")
+async def github_repos(username: str, request: Request):
+    if (error := await _behave("github")) is not None:
+        return error
+    if username.startswith("missing_"):
+        return _json({"message": "Not Found"}, 404)
+    rng = _seeded(username + "/repos")
+    return _github_response(request, [
+        {
+            "name": f"repo-{i}",
+            "description": rng.choice(["", "side project", "a tool I needed"]),
+            "stargazers_count": int(rng.paretovariate(1.5)) - 1,
+            "language": rng.choice(GITHUB_LANGUAGES),
+        }
+        for i in range(rng.randint(0, 10))
+    ])
+
+
+# ============================================
+# GEMINI
+# ============================================
+
+@app.post("/gemini/{version}/models/{model_action:path}")
+async def gemini_generate(version: str, model_action: str, request: Request):
+    if (error := await _behave("gemini")) is not None:
+        return error
+    body = await request.json()
+    prompt = " ".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+    if "chemistry_score" in prompt:
+        text = json.dumps({
+            "chemistry_score": random.randint(40, 95),
+            "vibe": random.choice(["🔥 Strong vibe", "✨ Good match", "🤝 Could work"]),
+            "why": "You both ship fast and cover each other's gaps.",
+            "build_idea": "A weekend tool for a workflow you both find painful",
+        })
+    else:
+        text = "Ships side projects faster than most people finish the README"
+    return _json({
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4},
+    })
+
+
+# ============================================
+# RESEND
+# ============================================
+
+@app.post("/resend/emails")
+async def resend_send(request: Request):
+    if (error := await _behave("resend")) is not None:
+        return error
+    await request.body()
+    return _json({"id": str(uuid.uuid4())})
+
+
+# ============================================
+# CONTROL
+# ============================================
+
+@app.get("/__stats")
+async def get_stats():
+    return {"config": config, "stats": stats}
+
+
+@app.post("/__config")
+async def set_config(request: Request):
+    """Change latency/errors mid-run, e.g. {"latency_ms": {"gemini": 3000}, "error_rate": {"gemini": 0.2}}."""
+    update = await request.json()
+    for key in ("latency_ms", "error_rate"):
+        for service, value in (update.get(key) or {}).items():
+            if service in SERVICES:
+                config[key][service] = float(value)
+    if "jitter" in update:
+        config["jitter"] = float(update["jitter"])
+    return config
+
+
+def _per_service(spec: str) -> dict:
+    """'gemini=800,github=150' → {'gemini': 800.0, 'github': 150.0}"""
+    values = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        service, _, value = item.partition("=")
+        if service not in SERVICES:
+            raise SystemExit(f"Unknown service {service!r} (expected one of {', '.join(SERVICES)})")
+        values[service] = float(value)
+    return values
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake GitHub / Gemini / Resend for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="", help="median ms per service, e.g. gemini=800,github=150")
+    parser.add_argument("--errors", default="", help="error rate per service, e.g. gemini=0.05")
+    parser.add_argument("--jitter", type=float, default=config["jitter"])
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config["latency_ms"].update(_per_service(args.latency))
+    config["error_rate"].update(_per_service(args.errors))
+    config["jitter"] = args.jitter
+    if args.seed is not None:
+        random.seed(args.seed)
+    print(f"[fakes] {json.dumps(config)}", file=sys.stderr)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,184 @@
+"""
+Partners - loadtest/seed.py
+Fill a local Postgres with synthetic builders (benchmarks/synthetic.py) for
+load tests: applies the migrations, then COPYs builders, sessions, follows and
+community memberships in chunks, so 1M builders fit in memory and seed in minutes.
+
+    DATABASE_URL=postgresql://postgres@localhost/partners_load \\
+        python loadtest/seed.py --builders 100000 --sessions 2000 --reset
+
+Every seeded builder's password is LOADTEST_PASSWORD. Sessions are named
+loadtest-session-<i> for builder_<i>, so the driver can use them without a DB.
+Refuses to run against anything but a local database unless --allow-remote.
+"""
+
+import io
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import bcrypt
+from synthetic import iter_builders
+
+LOADTEST_PASSWORD = "loadtest-password"
+SESSION_PREFIX = "loadtest-session-"
+CHUNK = 10_000
+
+BUILDER_COLUMNS = (
+    "username", "password", "github_username", "avatar", "bio", "building_style", "interests",
+    "open_to", "availability", "current_idea", "city", "github_languages", "github_repos",
+    "total_stars", "public_repos", "learning", "experience_level", "looking_for", "email",
+    "created_at", "updated_at",
+)
+
+COMMUNITIES = [
+    ("AI Builders", "interest"), ("Rustaceans", "stack"), ("Paris Builders", "city"),
+    ("Weekend Hackers", "hackathon"), ("Frontend Guild", "stack"), ("Design Engineers", "design"),
+    ("Open Source Crew", "interest"), ("Climate Tech", "interest"), ("Indie Games", "interest"),
+    ("London Builders", "city"),
+]
+
+
+def session_id(i: int) -> str:
+    return f"{SESSION_PREFIX}{i}"
+
+
+def _is_local(dsn: str) -> bool:
+    parsed = urlparse(dsn)
+    host = parsed.hostname or parse_qs(parsed.query).get("host", [""])[0]
+    return host in ("", "localhost", "127.0.0.1", "::1") or host.startswith("/")
+
+
+def _pg_array(values) -> str:
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in values)
+    return "{" + ",".join(f'"{v}"' for v in escaped) + "}"
+
+
+def _copy(cur, table: str, columns: tuple, rows):
+    """COPY rows (iterables of Python values; None → NULL) into `table` as CSV."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["\\N" if v is None else v for v in row])
+    buf.seek(0)
+    cur.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf
+    )
+
+
+def _builder_row(b: dict, password_hash: str) -> tuple:
+    return (
+        b["username"], password_hash, b["github_username"], b["avatar"], b["bio"],
+        b["building_style"], _pg_array(b["interests"]), _pg_array(b["open_to"]), b["availability"],
+        b["current_idea"], b["city"], _pg_array(b["github_languages"]), json.dumps(b["github_repos"]),
+        b["total_stars"], b["public_repos"], _pg_array(b["learning"]), b["experience_level"],
+        b["looking_for"], f"{b['username']}@loadtest.invalid", b["created_at"].isoformat(),
+        b["updated_at"].isoformat(),
+    )
+
+
+# ============================================
+# SEED
+# ============================================
+
+def reset(cur):
+    cur.execute("""
+        TRUNCATE builders, sessions, follows, communities, community_members,
+                 email_outbox, github_cache CASCADE
+    """)
+
+
+def seed(conn, builders: int, sessions: int, follows: int, members: int, seed_value: int):
+    rng = random.Random(seed_value)
+    # One hash for everyone: hashing 1M passwords would take hours
+    password_hash = bcrypt.hashpw(LOADTEST_PASSWORD.encode(),
+                                  bcrypt.gensalt(int(os.environ.get("BCRYPT_ROUNDS", 12)))).decode()
+    started = time.perf_counter()
+
+    with conn.cursor() as cur:
+        done, chunk = 0, []
+        for b in iter_builders(builders, seed=seed_value, chunk=CHUNK):
+            chunk.append(_builder_row(b, password_hash))
+            if len(chunk) == CHUNK:
+                _copy(cur, "builders", BUILDER_COLUMNS, chunk)
+                conn.commit()
+                done += len(chunk)
+                chunk = []
+                print(f"[seed] builders {done:,}/{builders:,} ({done / (time.perf_counter() - started):,.0f}/s)")
+        if chunk:
+            _copy(cur, "builders", BUILDER_COLUMNS, chunk)
+            conn.commit()
+
+        sessions = min(sessions, builders)
+        _copy(cur, "sessions", ("session_id", "username"),
+              ((session_id(i), f"builder_{i}") for i in range(sessions)))
+
+        # Session holders follow a handful of others, skewed toward low (older) ids like a real graph
+        follow_rows = set()
+        for i in range(sessions):
+            for _ in range(rng.randint(0, follows * 2)):
+                j = min(builders - 1, int(rng.paretovariate(1.2)) - 1 + rng.randrange(0, 50))
+                if j != i:
+                    follow_rows.add((f"builder_{i}", f"builder_{j}"))
+        _copy(cur, "follows", ("follower_username", "following_username"), follow_rows)
+
+        community_ids = []
+        for name, kind in COMMUNITIES:
+            cur.execute(
+                "INSERT INTO communities (name, description, type) VALUES (%s, %s, %s) RETURNING id",
+                (name, f"{name} (load test)", kind),
+            )
+            community_ids.append(str(cur.fetchone()["id"]))
+        member_rows = {
+            (community_ids[k], f"builder_{rng.randrange(builders)}")
+            for k in range(len(community_ids))
+            for _ in range(min(members, builders))
+        }
+        # Row triggers keep communities.members_count right (COPY fires them)
+        _copy(cur, "community_members", ("community_id", "username"), member_rows)
+        conn.commit()
+
+        conn.autocommit = True
+        cur.execute("ANALYZE builders, sessions, follows, communities, community_members")
+
+    print(f"[seed] {builders:,} builders, {sessions:,} sessions, {len(follow_rows):,} follows, "
+          f"{len(member_rows):,} memberships in {time.perf_counter() - started:.1f}s")
+    return community_ids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a local Postgres for load tests")
+    parser.add_argument("--builders", type=int, default=10_000)
+    parser.add_argument("--sessions", type=int, default=1_000, help="builders given a ready session")
+    parser.add_argument("--follows", type=int, default=10, help="mean follows per session holder")
+    parser.add_argument("--members", type=int, default=200, help="members per community")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="truncate app tables first")
+    parser.add_argument("--allow-remote", action="store_true")
+    args = parser.parse_args()
+
+    dsn = os.environ.get("DATABASE_URL", "")
+    if not _is_local(dsn) and not args.allow_remote:
+        raise SystemExit("[seed] DATABASE_URL is not local — refusing (pass --allow-remote to override)")
+
+    from migrate import migrate
+    from database import get_db_conn
+
+    migrate()
+    conn = get_db_conn()
+    try:
+        if args.reset:
+            with conn.cursor() as cur:
+                reset(cur)
+            conn.commit()
+        seed(conn, args.builders, args.sessions, args.follows, args.members, args.seed)
+    finally:
+        conn.close()
@@ -0,0 +1,140 @@
+"""
+Partners - loop_watchdog.py
+Event-loop stall detector. A watchdog thread posts a heartbeat onto the loop
+every few ms; when the loop takes longer than LOOP_WATCHDOG_MS to run it,
+something synchronous is holding the loop (a psycopg2 call, bcrypt, an SDK
+call in an async handler). The watchdog then grabs the loop thread's stack
+with sys._current_frames(), attributes it to the request being served, and
+records the stall duration in /metrics and the log.
+
+Off by default. LOOP_WATCHDOG_MS=100 turns it on (dev or prod — the cost is
+one wake-up per half threshold and one dict write per request).
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+
+import metrics
+
+LOOP_WATCHDOG_MS = float(os.environ.get("LOOP_WATCHDOG_MS", 0) or 0)
+STACK_FRAMES     = int(os.environ.get("LOOP_WATCHDOG_FRAMES", 12))
+# The same stall site is logged at most once per interval (the metrics still count every one)
+LOG_INTERVAL     = float(os.environ.get("LOOP_WATCHDOG_LOG_INTERVAL", 60))
+
+stall_seconds = metrics.register(metrics.Histogram(
+    "partners_event_loop_stall_seconds", "Event loop blocked longer than LOOP_WATCHDOG_MS, by endpoint",
+    ("endpoint",), buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+))
+
+
+def enabled() -> bool:
+    return LOOP_WATCHDOG_MS > 0
+
+
+# ============================================
+# REQUEST ATTRIBUTION
+# ============================================
+
+# task → ASGI scope of the request it is serving (the router fills in scope["route"])
+_task_scopes = {}
+
+
+class WatchdogMiddleware:
+    """Remembers which request each task serves, so a stall can be pinned to an endpoint."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        task = asyncio.current_task()
+        _task_scopes[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _task_scopes.pop(task, None)
+
+
+def _endpoint(loop) -> str:
+    # Read from the watchdog thread while the loop thread is stuck — the
+    # current task cannot change under us until the loop moves again
+    task = asyncio.tasks._current_tasks.get(loop)
+    scope = _task_scopes.get(task)
+    if scope is not None:
+        route = getattr(scope.get("route"), "path", None) or scope.get("path", "?")
+        return f"{scope.get('method', '?')} {route}"
+    if task is not None:
+        return f"task:{task.get_name()}"
+    return "loop"  # a plain callback, not a task
+
+
+# ============================================
+# WATCHDOG
+# ============================================
+
+class LoopWatchdog:
+    def __init__(self, threshold_ms: float = LOOP_WATCHDOG_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = max(0.005, self.threshold / 2)
+        self.stats = {"stalls": 0, "total_ms": 0.0, "max_ms": 0.0}
+        self.recent = deque(maxlen=20)   # last stalls: {endpoint, ms, stack}
+        self._last_logged = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._loop_thread_id = None
+
+    def start(self, loop: asyncio.AbstractEventLoop = None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        print(f"[watchdog] Watching the event loop (threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            beat = threading.Event()
+            posted = time.monotonic()
+            try:
+                self._loop.call_soon_threadsafe(beat.set)
+            except RuntimeError:
+                return  # loop closed
+            if not beat.wait(self.threshold):
+                # Stalled: the loop thread is inside the blocking call right now
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = traceback.format_list(traceback.extract_stack(frame, limit=STACK_FRAMES)) if frame else []
+                endpoint = _endpoint(self._loop)
+                del frame
+                while not beat.wait(0.05):
+                    if self._stop.is_set():
+                        return
+                self._record(endpoint, time.monotonic() - posted, stack)
+            self._stop.wait(self.interval)
+
+    def _record(self, endpoint: str, seconds: float, stack: list):
+        ms = seconds * 1000
+        self.stats["stalls"] += 1
+        self.stats["total_ms"] += ms
+        self.stats["max_ms"] = max(self.stats["max_ms"], ms)
+        stall_seconds.observe((endpoint,), seconds)
+        self.recent.append({"endpoint": endpoint, "ms": round(ms, 1), "stack": stack})
+
+        site = (endpoint, stack[-1] if stack else "")
+        now = time.monotonic()
+        if now - self._last_logged.get(site, -LOG_INTERVAL) >= LOG_INTERVAL:
+            self._last_logged[site] = now
+            print(f"[watchdog] Event loop blocked {ms:.0f}ms in {endpoint}:\n" + "".join(stack).rstrip())
+
+
+watchdog = LoopWatchdog()
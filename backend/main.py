@@ -1,43 +1,165 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from typing import List, Optional
-import uvicorn
+from typing import List, Optional, NamedTuple
 import os
 import json
 import uuid
 import re
+import orjson
+import asyncio
+import contextlib
+import time
+import random
 from datetime import datetime
-import httpx
 from typing import Any
-from brain import analyze_github_profile, find_build_matches, get_demo_match
-from emails import send_match_notification, send_welcome_email
+import brain
+import emails
+import metrics
+import loop_watchdog
+import profiler
+import admission
+import singleflight
+import passwords
+import invalidation
+import github_api
+import cache as app_cache
+from brain import analyze_github_profile, find_build_matches, get_demo_match, ai_enabled
+from emails import build_welcome_email
+from email_dispatcher import dispatcher as email_dispatcher, outbox_enabled, outbox_row
+from github_api import fetch_github_data, open_client as open_github_client, close_client as close_github_client
+from github_sync import run_refresher, sync_enabled
+from invalidation import listen as listen_for_invalidations
+from migrate import migrate_if_needed
+from cache import (
+    etag_matches,
+    profile_body,
+    CachedBody,
+    sessions as session_cache,
+    profiles as profile_cache,
+    follows as follows_cache,
+    communities as community_cache,
+)
+from passwords import (
+    hash_password_async,
+    verify_password_async,
+    upgrade_hash_if_needed,
+    PasswordPoolBusy,
+)
 from database import (
     get_builders,
+    get_builder_profiles,
     get_builder_by_username,
-    upsert_builder,
+    get_builder_profile,
+    update_builder_by_session,
+    register_builder,
     save_session,
+    get_session_builder,
     get_session_username,
     delete_session,
     delete_expired_sessions,
     get_communities,
     get_community_by_id,
-    get_community_members,
+    get_community_member_profiles,
     join_community as db_join_community,
-    hash_password,
-    verify_password,
-    create_follows_table,
+    update_password,
+    open_pool,
+    close_pool,
     toggle_follow,
     get_follow_stats,
-    is_following as db_is_following,
+    QUERY_PROFILER,
+    QueryProfilerMiddleware,
     get_following_list,
 )
 
+# Set to 0 when migrations run as a separate release step
+MIGRATE_ON_STARTUP = os.environ.get("DB_MIGRATE_ON_STARTUP", "1").lower() not in ("0", "false", "no", "off")
+SESSION_MAX_AGE_DAYS     = int(os.environ.get("SESSION_MAX_AGE_DAYS", 30))
+SESSION_CLEANUP_INTERVAL = float(os.environ.get("SESSION_CLEANUP_INTERVAL", 3600))
+
+# ── Lifespan: per-worker startup / shutdown ────────────────────
+# Runs once in every uvicorn worker process (see Procfile / WEB_CONCURRENCY).
+async def _open_pool():
+    try:
+        await asyncio.to_thread(open_pool)
+    except Exception as e:
+        # Keep serving (/health reports degraded); db_session() retries on first use
+        print(f"[db] Pool warm-up failed: {type(e).__name__}")
+
+
+async def _migrate():
+    if not MIGRATE_ON_STARTUP:
+        return
+    try:
+        await asyncio.to_thread(migrate_if_needed)
+    except Exception as e:
+        print(f"[migrate] Startup migration failed: {type(e).__name__}: {e}")
+
+
+async def _expire_sessions(stop: asyncio.Event):
+    """Delete sessions older than SESSION_MAX_AGE_DAYS every SESSION_CLEANUP_INTERVAL seconds."""
+    # Spread the first run so workers started together do not all purge at once
+    delay = random.uniform(0, min(60.0, SESSION_CLEANUP_INTERVAL))
+    while True:
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=delay)
+            return
+        except asyncio.TimeoutError:
+            pass
+        try:
+            expired = await asyncio.to_thread(delete_expired_sessions, SESSION_MAX_AGE_DAYS)
+            if expired:
+                print(f"[sessions] Deleted {expired} expired session(s)")
+        except Exception as e:
+            print(f"[sessions] Cleanup failed: {type(e).__name__}: {e}")
+        delay = SESSION_CLEANUP_INTERVAL
+
+
+async def _warm_sdks():
+    """Gemini / Resend SDK imports are slow; do them after startup instead of on the first request."""
+    for warm_up in (brain.warm_up, emails.warm_up):
+        try:
+            await asyncio.to_thread(warm_up)
+        except Exception as e:
+            print(f"[startup] {warm_up.__module__} warm-up failed: {type(e).__name__}")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop = asyncio.Event()
+    started = time.perf_counter()
+    # Independent network round trips — overlap them
+    await asyncio.gather(_open_pool(), _migrate(), open_github_client())
+
+    tasks = [
+        asyncio.create_task(listen_for_invalidations(stop)),
+        asyncio.create_task(_warm_sdks()),
+        asyncio.create_task(_expire_sessions(stop)),
+    ]
+    await email_dispatcher.start()
+    if sync_enabled():
+        tasks.append(asyncio.create_task(run_refresher(stop)))
+    if loop_watchdog.enabled():
+        loop_watchdog.watchdog.start()
+    print(f"[worker] {os.getpid()} ready in {(time.perf_counter() - started) * 1000:.0f}ms")
+    yield
+
+    # In-flight requests are done by now; stop background work, then let go of connections
+    loop_watchdog.watchdog.stop()
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await email_dispatcher.drain()
+    await close_github_client()
+    await asyncio.to_thread(close_pool)
+    print(f"[worker] {os.getpid()} stopped")
+
 # ── App init ───────────────────────────────────────────────────
 app = FastAPI(
     title="Partners API",
     version="1.1.0",
-    description="Find someone to build with. No pitch decks. Just builders."
+    description="Find someone to build with. No pitch decks. Just builders.",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -47,12 +169,54 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# ── DB startup migration ───────────────────────────────────────
-try:
-    create_follows_table()
-except Exception as e:
-    print(f"[db] Startup migration failed: {e}")
+if QUERY_PROFILER:
+    app.add_middleware(QueryProfilerMiddleware)
+if loop_watchdog.enabled():
+    app.add_middleware(loop_watchdog.WatchdogMiddleware)
+if profiler.enabled():
+    app.add_middleware(profiler.RequestProfilerMiddleware)
+# Outermost, so its timings include CORS and error handling
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Existing counters, exposed on /metrics as they are
+metrics.register(metrics.StatsCollector(
+    "partners_cache_events_total", "Cache hits/misses/coalesced loads/backend errors", ("cache", "event"),
+    lambda: {(c.namespace, k): v for c in app_cache.ALL_CACHES for k, v in c.stats.items()},
+))
+metrics.register(metrics.StatsCollector(
+    "partners_email_events_total", "Email dispatcher events", ("event",),
+    lambda: {(k,): v for k, v in email_dispatcher.stats.items()},
+))
+metrics.register(metrics.StatsCollector(
+    "partners_cache_invalidation_events_total", "LISTEN/NOTIFY invalidation events", ("event",),
+    lambda: {(k,): v for k, v in invalidation.stats.items()},
+))
+metrics.register(metrics.StatsCollector(
+    "partners_bcrypt_pool", "bcrypt pool counters and queue depth", ("stat",),
+    lambda: {(k,): v for k, v in passwords.pool_stats().items()}, kind="gauge",
+))
+metrics.register(metrics.StatsCollector(
+    "partners_github_rate_limit", "Last X-RateLimit-* values GitHub reported", ("field",),
+    lambda: {(k,): v for k, v in github_api.rate_limit.items()}, kind="gauge",
+))
+metrics.register(metrics.StatsCollector(
+    "partners_match_admission", "Chemistry-check admission: admitted/refused counts and Gemini slots in use", ("stat",),
+    lambda: {(k,): v for k, v in admission.stats().items()}, kind="gauge",
+))
+
+metrics.register(metrics.StatsCollector(
+    "partners_singleflight_total", "Coalescing: calls, callers that joined an in-flight call, errors", ("op", "event"),
+    lambda: {(g.name, k): v for g in singleflight.ALL_GROUPS for k, v in g.stats.items()},
+))
+
+# ── Password pool back-pressure ────────────────────────────────
+@app.exception_handler(PasswordPoolBusy)
+async def password_pool_busy(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, try again in a moment"},
+        headers={"Retry-After": "1"},
+    )
 
 # ── Username validation ────────────────────────────────────────
 USERNAME_RE = re.compile(r'^[a-zA-Z0-9_]{3,30}$')
@@ -120,6 +284,7 @@ class MatchResponse(BaseModel):
     vibe: str
     why: str
     build_idea: str
+    degraded: Optional[str] = None  # set when the AI step was skipped: "rate_limited" | "busy"
 
 class CommunityResponse(BaseModel):
     id: str
@@ -178,75 +343,106 @@ def _safe_profile(row) -> BuilderProfile:
     d.pop('email', None)
     return BuilderProfile(**d)
 
+def _json_response(payload) -> Response:
+    """
+    Fast path for trusted rows (database.PROFILE_SELECT): straight to JSON bytes
+    with orjson, skipping the _row_to_dict → BuilderProfile → response_model
+    double validation. Benchmark: benchmarks/bench_serialization.py
+    """
+    return Response(content=orjson.dumps(payload), media_type="application/json")
+
+def _cached_json_response(request: Request, entry: CachedBody, cache_control: str) -> Response:
+    """Serve a cache.CachedBody, or 304 if the client already has it."""
+    headers = {"ETag": entry.etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+async def load_profile(username: str) -> Optional[CachedBody]:
+    """Read-through profile cache; concurrent misses for one builder share a query."""
+    def load():
+        row = get_builder_profile(username)
+        return profile_body(row) if row else None
+    return await profile_cache.get_or_compute(username, load)
+
+# Community data is public and only changes on joins: let browsers/CDN hold it briefly
+# and keep serving the old copy while they revalidate in the background.
+COMMUNITY_CACHE_CONTROL = "public, max-age=30, stale-while-revalidate=300"
+
 # ============================================
-# GITHUB API
+# SESSION DEPENDENCY
 # ============================================
 
-async def fetch_github_data(github_username: str) -> dict:
-    try:
-        async with httpx.AsyncClient() as client:
-            headers = {"Accept": "application/vnd.github.v3+json"}
-            github_token = os.environ.get("GITHUB_TOKEN")
-            if github_token:
-                headers["Authorization"] = f"token {github_token}"
-
-            profile_res = await client.get(
-                f"https://api.github.com/users/{github_username}",
-                headers=headers,
-                timeout=10.0
-            )
-            if profile_res.status_code == 404:
-                raise HTTPException(status_code=404, detail=f"GitHub user '{github_username}' not found")
-            if profile_res.status_code != 200:
-                raise HTTPException(status_code=500, detail="GitHub API error")
-
-            profile = profile_res.json()
-
-            repos_res = await client.get(
-                f"https://api.github.com/users/{github_username}/repos?sort=updated&per_page=10",
-                headers=headers,
-                timeout=10.0
-            )
-            repos = repos_res.json() if repos_res.status_code == 200 else []
-
-            languages = {}
-            for repo_data in (repos if isinstance(repos, list) else [])[:5]:
-                repo = repo_data if isinstance(repo_data, dict) else {}
-                lang = repo.get('language')
-                if lang:
-                    languages[lang] = languages.get(lang, 0) + 1
-
-            return {
-                "github_username": github_username,
-                "avatar": profile.get("avatar_url", f"https://github.com/{github_username}.png"),
-                "bio": profile.get("bio", ""),
-                "github_languages": sorted(languages.keys(), key=languages.get, reverse=True)[:5],
-                "github_repos": [
-                    {
-                        "name": r.get("name", "unknown"),
-                        "description": r.get("description", ""),
-                        "stars": r.get("stargazers_count", 0),
-                        "language": r.get("language", "")
-                    }
-                    for r in (repos if isinstance(repos, list) else [])[:5]
-                ],
-                "total_stars": sum(
-                    r.get("stargazers_count", 0) if isinstance(r, dict) else 0
-                    for r in (repos if isinstance(repos, list) else [])
-                ),
-                "public_repos": profile.get("public_repos", 0)
-            }
-    except httpx.HTTPError as e:
-        print(f"GitHub fetch error: {e}")
-        return {
-            "github_username": github_username,
-            "avatar": f"https://github.com/{github_username}.png",
-            "bio": "",
-            "github_languages": [],
-            "github_repos": [],
-            "total_stars": 0,
-            "public_repos": 0
-        }
+class CurrentBuilder(NamedTuple):
+    username: str
+    profile: dict
+
+
+# A page firing several requests with a cold session runs its lookup once
+session_loads = singleflight.SingleFlight("get_session_builder")
+
+
+class SessionBuilder:
+    """
+    FastAPI dependency: session_id → CurrentBuilder.
+    session_id is read from the query string, or from the JSON body for POST endpoints
+    whose request model carries it. Sessions and profiles come from the shared cache;
+    a cold session with profile=True is one sessions JOIN builders query that seeds both.
+    """
+
+    def __init__(self, profile: bool = True, required: bool = True):
+        self.profile = profile
+        self.required = required
+
+    async def _resolve(self, session_id: str) -> Optional[CurrentBuilder]:
+        username = await session_cache.aget(session_id)
+        if username is None and self.profile:
+            # Taken before the read: a logout or invalidation that lands mid-query wins
+            session_generation = await session_cache.ageneration()
+            generation = await profile_cache.ageneration()
+            row = await session_loads.do(session_id, lambda: get_session_builder(session_id))
+            if row is None:
+                return None
+            entry = profile_body(row)
+            await session_cache.aset(session_id, row['username'], generation=session_generation)
+            await profile_cache.aset(row['username'], entry, generation=generation)
+            return CurrentBuilder(username=row['username'], profile=_session_profile(entry))
+        if username is None:
+            username = await session_cache.get_or_compute(session_id, lambda: get_session_username(session_id))
+            if username is None:
+                return None
+        if not self.profile:
+            return CurrentBuilder(username=username, profile={"username": username})
+        entry = await load_profile(username)
+        if entry is None:
+            return None
+        return CurrentBuilder(username=username, profile=_session_profile(entry))
+
+    async def __call__(self, request: Request, session_id: Optional[str] = None) -> Optional[CurrentBuilder]:
+        if session_id is None and request.method != "GET":
+            try:
+                body = await request.json()
+                session_id = body.get("session_id") if isinstance(body, dict) else None
+            except Exception:
+                session_id = None
+
+        with metrics.span("auth"):
+            me = await self._resolve(session_id) if session_id else None
+        if me is None and self.required:
+            raise HTTPException(status_code=401, detail="Invalid session")
+        return me
+
+
+def _session_profile(entry: CachedBody) -> dict:
+    profile = _row_to_dict(entry.row)
+    profile.pop('email', None)
+    return profile
+
+
+require_builder   = SessionBuilder()
+optional_builder  = SessionBuilder(required=False)
+require_username  = SessionBuilder(profile=False)
+optional_username = SessionBuilder(profile=False, required=False)
 
 # ============================================
 # AUTH ENDPOINTS
@@ -274,7 +470,7 @@ async def register(request: RegisterRequest):
     now = datetime.now().isoformat()
     new_builder = {
         "username": request.username,
-        "password": hash_password(request.password),
+        "password": await hash_password_async(request.password),
         **github_data,
         "bio": bio,
         "building_style": "figures_it_out",
@@ -288,15 +484,17 @@ async def register(request: RegisterRequest):
         "experience_level": "intermediate",
         "looking_for": "build_partner",
         "created_at": now,
-        "updated_at": now
+        "updated_at": now,
+        "github_synced_at": now,
     }
 
-    upsert_builder(new_builder)
     session_id = str(uuid.uuid4())
-    save_session(session_id, request.username)
-
-    if request.email:
-        send_welcome_email(request.email, request.username)
+    welcome = None
+    if request.email and outbox_enabled():
+        welcome = outbox_row("welcome", build_welcome_email(request.email, request.username))
+    register_builder(new_builder, session_id, outbox_email=welcome)
+    if welcome:
+        email_dispatcher.notify()
 
     profile = {k: v for k, v in new_builder.items() if k not in ('password', 'email')}
     return AuthResponse(
@@ -310,9 +508,14 @@ async def register(request: RegisterRequest):
 async def login(request: LoginRequest):
     builder_raw = get_builder_by_username(request.username)
     builder = _row_to_dict(builder_raw) if builder_raw else None
-    if not builder or not verify_password(request.password, builder_raw['password']):
+    if not builder or not await verify_password_async(request.password, builder_raw['password']):
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
+    # Transparent cost upgrade: BCRYPT_ROUNDS changed since this hash was made
+    new_hash = await upgrade_hash_if_needed(request.password, builder_raw['password'])
+    if new_hash:
+        update_password(request.username, new_hash)
+
     session_id = str(uuid.uuid4())
     save_session(session_id, request.username)
 
@@ -334,53 +537,34 @@ async def logout(request: LogoutRequest):
 
 @app.post("/profile/update")
 async def update_profile(request: UpdateProfileRequest):
-    username = get_session_username(request.session_id)
-    if not username:
+    fields = {
+        k: v for k, v in request.model_dump(exclude={'session_id'}).items()
+        if v is not None
+    }
+    updated = update_builder_by_session(request.session_id, fields)
+    if not updated:
         raise HTTPException(status_code=401, detail="Invalid session")
-
-    builder = get_builder_by_username(username)
-    if not builder:
-        raise HTTPException(status_code=404, detail="Builder not found")
-
-    updated = _row_to_dict(builder)
-
-    if request.building_style is not None:   updated['building_style'] = request.building_style
-    if request.interests is not None:        updated['interests'] = request.interests
-    if request.open_to is not None:          updated['open_to'] = request.open_to
-    if request.availability is not None:     updated['availability'] = request.availability
-    if request.current_idea is not None:     updated['current_idea'] = request.current_idea
-    if request.city is not None:             updated['city'] = request.city
-    if request.email is not None:            updated['email'] = request.email
-    if request.learning is not None:         updated['learning'] = request.learning
-    if request.experience_level is not None: updated['experience_level'] = request.experience_level
-    if request.looking_for is not None:      updated['looking_for'] = request.looking_for
-
-    updated['updated_at'] = datetime.now().isoformat()
-    upsert_builder(updated)
-    return {"success": True, "profile": _safe_profile(updated)}
+    return {"success": True, "profile": _safe_profile(_row_to_dict(updated))}
 
 
 @app.get("/profile/following/list")
-async def list_following(session_id: str):
-    username = get_session_username(session_id)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid session")
-    return {"following": get_following_list(username)}
+async def list_following(me: CurrentBuilder = Depends(require_username)):
+    following = await follows_cache.get_or_compute(me.username, lambda: get_following_list(me.username))
+    return {"following": following}
 
 
 @app.get("/profile/{username}/stats")
-async def get_user_stats(username: str, session_id: Optional[str] = None):
-    stats = get_follow_stats(username)
-    current_username = get_session_username(session_id) if session_id else None
-    following_status = db_is_following(current_username, username) if current_username else False
-    return {**stats, "is_following": following_status}
+async def get_user_stats(username: str, me: Optional[CurrentBuilder] = Depends(optional_username)):
+    return get_follow_stats(username, viewer=me.username if me else None)
 
 
 @app.post("/profile/{target_username}/follow")
-async def follow_user(target_username: str, request: FollowRequest):
-    current_username = get_session_username(request.session_id)
-    if not current_username:
-        raise HTTPException(status_code=401, detail="Invalid session")
+async def follow_user(
+    target_username: str,
+    request: FollowRequest,
+    me: CurrentBuilder = Depends(require_username),
+):
+    current_username = me.username
     if current_username == target_username:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
     status = toggle_follow(current_username, target_username)
@@ -388,11 +572,12 @@ async def follow_user(target_username: str, request: FollowRequest):
 
 
 @app.get("/profile/{username}", response_model=BuilderProfile)
-async def get_profile(username: str):
-    builder = get_builder_by_username(username)
-    if not builder:
+async def get_profile(username: str, request: Request):
+    cached = await load_profile(username)
+    if not cached:
         raise HTTPException(status_code=404, detail="Builder not found")
-    return _safe_profile(builder)
+    # Browsers revalidate on every view; unchanged profiles cost no body bytes
+    return _cached_json_response(request, cached, "no-cache")
 
 # ============================================
 # DISCOVERY & MATCHING
@@ -400,16 +585,16 @@ async def get_profile(username: str):
 
 @app.get("/discover", response_model=List[BuilderProfile])
 async def discover_builders(
-    session_id: Optional[str] = None,
     limit: int = 20,
     filter_interest: Optional[str] = None,
     filter_availability: Optional[str] = None,
-    local_only: bool = False
+    local_only: bool = False,
+    me: Optional[CurrentBuilder] = Depends(optional_builder),
 ):
-    current_username = get_session_username(session_id) if session_id else None
-    current_builder = _row_to_dict(get_builder_by_username(current_username)) if current_username else None
+    current_username = me.username if me else None
+    current_builder = me.profile if me else None
 
-    all_builders = [_row_to_dict(b) for b in get_builders()]
+    all_builders = get_builder_profiles()
 
     if current_username:
         all_builders = [b for b in all_builders if b['username'] != current_username]
@@ -448,54 +633,75 @@ async def discover_builders(
         return (priority, b.get('updated_at', ''))
 
     all_builders.sort(key=sort_key, reverse=True)
+    return _json_response(all_builders[:limit])
 
-    profiles = []
-    for b in all_builders[:limit]:
-        b.pop('password', None)
-        b.pop('email', None)
-        profiles.append(BuilderProfile(**b))
-    return profiles
 
+# Double-clicked checks for one (builder, target) share a single Gemini call
+match_flights = singleflight.SingleFlight("find_build_matches")
 
-@app.post("/match/{target_username}", response_model=MatchResponse)
-async def get_match_analysis(target_username: str, session_id: str, local_only: bool = False):
-    current_username = get_session_username(session_id)
-    if not current_username:
-        raise HTTPException(status_code=401, detail="Invalid session")
 
-    current_builder = _row_to_dict(get_builder_by_username(current_username))
-    target_builder  = _row_to_dict(get_builder_by_username(target_username))
+def _ai_match(current_builder: dict, target_builder: dict, local_only: bool) -> tuple:
+    """(match, degraded reason). Runs in a worker thread; never waits for Gemini capacity."""
+    with admission.gemini_match(current_builder['username']) as degraded:
+        match = find_build_matches(current_builder, target_builder,
+                                   local_only=local_only, use_ai=degraded is None)
+    return match, degraded
+
+
+@app.post("/match/{target_username}", response_model=MatchResponse)
+async def get_match_analysis(
+    target_username: str,
+    local_only: bool = False,
+    me: CurrentBuilder = Depends(require_builder),
+):
+    current_username = me.username
+    current_builder  = me.profile
+    target_cached    = await load_profile(target_username)
+    target_builder   = target_cached.row if target_cached else None
 
     if not current_builder or not target_builder:
         raise HTTPException(status_code=404, detail="Builder not found")
 
-    demo_result  = get_demo_match(current_username, target_username)
-    match_result = demo_result if demo_result else find_build_matches(
-        current_builder, target_builder, local_only=local_only
-    )
+    demo_result = get_demo_match(current_username, target_username)
+    degraded    = None
+    if demo_result:
+        match_result = demo_result
+    elif not ai_enabled():
+        match_result = find_build_matches(current_builder, target_builder, local_only=local_only, use_ai=False)
+    else:
+        match_result, degraded = await match_flights.do(
+            (current_username, target_username, local_only),
+            lambda: _ai_match(current_builder, target_builder, local_only),
+        )
 
     if not match_result:
         raise HTTPException(status_code=500, detail="Failed to generate match")
 
     target_email = target_builder.get("email")
     if target_email and not demo_result:
-        send_match_notification(
-            to_email=target_email,
-            to_username=target_username,
-            from_username=current_username,
-            from_avatar=current_builder.get("avatar", ""),
-            chemistry_score=match_result['chemistry_score'],
-            vibe=match_result['vibe'],
-            why=match_result['why'],
-            build_idea=match_result['build_idea'],
-        )
+        # Outbox INSERT off the loop; a failed notification never fails the check itself
+        try:
+            await asyncio.to_thread(
+                email_dispatcher.enqueue_match_check,
+                to_email=target_email,
+                to_username=target_username,
+                from_username=current_username,
+                from_avatar=current_builder.get("avatar", ""),
+                chemistry_score=match_result['chemistry_score'],
+                vibe=match_result['vibe'],
+                why=match_result['why'],
+                build_idea=match_result['build_idea'],
+            )
+        except Exception as e:
+            print(f"[email] Could not queue match email for {target_username}: {type(e).__name__}: {e}")
 
     return MatchResponse(
         matched_builder=_safe_profile(target_builder),
         chemistry_score=match_result['chemistry_score'],
         vibe=match_result['vibe'],
         why=match_result['why'],
-        build_idea=match_result['build_idea']
+        build_idea=match_result['build_idea'],
+        degraded=degraded,
     )
 
 # ============================================
@@ -503,40 +709,50 @@ async def get_match_analysis(target_username: str, session_id: str, local_only:
 # ============================================
 
 @app.get("/communities", response_model=List[CommunityResponse])
-async def list_communities():
-    rows = get_communities()
-    return [
-        CommunityResponse(
-            id=str(row['id']),
-            name=row['name'],
-            description=row.get('description', ''),
-            type=row.get('type', 'general'),
-            members_count=int(row.get('members_count', 0))
-        )
-        for row in rows
-    ]
+async def list_communities(request: Request):
+    def load():
+        return CachedBody([
+            CommunityResponse(
+                id=str(row['id']),
+                name=row['name'],
+                description=row.get('description', ''),
+                type=row.get('type', 'general'),
+                members_count=int(row.get('members_count', 0))
+            ).model_dump()
+            for row in get_communities()
+        ])
+    entry = await community_cache.get_or_compute("list", load, scope="communities")
+    return _cached_json_response(request, entry, COMMUNITY_CACHE_CONTROL)
 
 
 @app.get("/communities/{community_id}/members")
-async def list_community_members(community_id: str):
-    comm = get_community_by_id(community_id)
-    if not comm:
+async def list_community_members(community_id: str, request: Request):
+    def load():
+        comm = get_community_by_id(community_id)
+        if not comm:
+            return None
+        members = get_community_member_profiles(community_id)
+        return CachedBody({
+            "community_id": community_id,
+            "community_name": comm['name'],
+            "members": members,
+            "total": len(members)
+        })
+    entry = await community_cache.get_or_compute(
+        f"{community_id}:members", load, scope=f"community:{community_id}"
+    )
+    if entry is None:
         raise HTTPException(status_code=404, detail="Community not found")
-
-    members = get_community_members(community_id)
-    return {
-        "community_id": community_id,
-        "community_name": comm['name'],
-        "members": [_safe_profile(m) for m in members],
-        "total": len(members)
-    }
+    return _cached_json_response(request, entry, COMMUNITY_CACHE_CONTROL)
 
 
 @app.post("/communities/{community_id}/join")
-async def join_community_endpoint(community_id: str, request: JoinCommunityRequest):
-    username = get_session_username(request.session_id)
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid session")
+async def join_community_endpoint(
+    community_id: str,
+    request: JoinCommunityRequest,
+    me: CurrentBuilder = Depends(require_username),
+):
+    username = me.username
 
     comm = get_community_by_id(community_id)
     if not comm:
@@ -553,10 +769,6 @@ async def join_community_endpoint(community_id: str, request: JoinCommunityReque
 async def health_check():
     try:
         builders = get_builders()
-        try:
-            delete_expired_sessions(days=30)
-        except Exception:
-            pass
         return {
             "status": "ok",
             "version": "1.1.0",
@@ -572,6 +784,38 @@ async def health_check():
         }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    if metrics.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {metrics.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+# ============================================
+# ADMIN
+# ============================================
+
+@app.post("/admin/profile", include_in_schema=False)
+async def admin_profile(
+    request: Request,
+    seconds: float = 10,
+    format: str = "collapsed",
+    interval_ms: float = 5,
+    idle: bool = False,
+):
+    """Sample this worker for `seconds`; collapsed stacks or a speedscope file."""
+    if not profiler.enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler.is_admin(request.headers.get("authorization", "")):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    if format not in profiler.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(profiler.FORMATS)}")
+    sampler = await profiler.profile_process(seconds, max(1.0, interval_ms), include_idle=idle)
+    body, content_type = sampler.render(format, f"worker {os.getpid()}")
+    return Response(body, media_type=content_type,
+                    headers={"X-Profile-Samples": str(sampler.count)})
+
+
 @app.get("/")
 async def root():
     return {
@@ -586,5 +830,8 @@ async def root():
 # ============================================
 
 if __name__ == "__main__":
+    import uvicorn
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    # Multiple workers need an import string so each process builds its own app
+    uvicorn.run("main:app" if workers > 1 else app, host="0.0.0.0", port=port, workers=workers)
\ No newline at end of file
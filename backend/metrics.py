@@ -0,0 +1,237 @@
+"""
+Partners - metrics.py
+Request latency breakdown and Prometheus metrics (no client library needed).
+  span(name)          times one dependency call — db, gemini, github, email…
+                      into a histogram, and into the current request's
+                      Server-Timing header when there is one
+  MetricsMiddleware   per-route request histogram + the Server-Timing header
+  render()            Prometheus text exposition, served on /metrics
+Each worker keeps its own registry; every sample carries a `worker` label so
+series from different workers behind one port never overwrite each other.
+"""
+
+import os
+import time
+import threading
+import contextlib
+from contextvars import ContextVar
+from typing import Optional
+
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "").strip()  # when set, /metrics needs "Bearer <token>"
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "1").lower() not in ("0", "false", "no", "off")
+WORKER = str(os.getpid())
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (name, seconds) for every span finished inside the current request
+_request_spans: ContextVar[Optional[list]] = ContextVar("request_spans", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.append(f'worker="{WORKER}"')
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+# ============================================
+# METRIC TYPES
+# ============================================
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, labels: tuple, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labelnames, buckets
+        self._series = {}   # labels → [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, seconds: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in items:
+            for bound, count in zip(self.buckets, series):
+                le = _labels(self.labelnames, labels, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{le} {count}"
+            le = _labels(self.labelnames, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{le} {series[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]:.6f}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}"
+
+
+class StatsCollector:
+    """Exposes an existing stats dict (cache.stats, dispatcher.stats…) without copying its bookkeeping."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple, read, kind: str = "counter"):
+        self.name, self.help, self.labelnames, self.read, self.kind = name, help, labelnames, read, kind
+
+    def samples(self):
+        for labels, value in self.read().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render() -> bytes:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        try:
+            lines.extend(metric.samples())
+        except Exception as e:
+            print(f"[metrics] {metric.name}: {type(e).__name__}: {e}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+# ============================================
+# APP METRICS
+# ============================================
+
+http_seconds = register(Histogram(
+    "partners_http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"),
+))
+http_in_flight = register(Gauge("partners_http_requests_in_flight", "Requests being handled"))
+dependency_seconds = register(Histogram(
+    "partners_dependency_duration_seconds", "Time spent in one dependency call (span)", ("dependency",),
+))
+dependency_errors = register(Counter(
+    "partners_dependency_errors_total", "Dependency calls (spans) that raised", ("dependency",),
+))
+
+
+# ============================================
+# SPANS
+# ============================================
+
+@contextlib.contextmanager
+def span(name: str):
+    """
+    Time the block as dependency `name`. Safe in worker threads: asyncio.to_thread
+    copies the context, so spans there still land in the calling request.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        dependency_errors.inc((name,))
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        dependency_seconds.observe((name,), elapsed)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+
+
+def server_timing(spans: list, total: float) -> str:
+    """Server-Timing value: one entry per span name (summed), plus the whole request."""
+    summed = {}
+    for name, seconds in spans:
+        total_s, count = summed.get(name, (0.0, 0))
+        summed[name] = (total_s + seconds, count + 1)
+    parts = [
+        f'{name};dur={seconds * 1000:.1f};desc="{count} call{"s" if count != 1 else ""}"'
+        for name, (seconds, count) in summed.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+class MetricsMiddleware:
+    """
+    Pure ASGI (no BaseHTTPMiddleware task hop). Routes are labelled by their
+    template (/profile/{username}) so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        spans = []
+        token = _request_spans.set(spans)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    value = server_timing(spans, time.perf_counter() - started)
+                    # Timing-Allow-Origin lets the cross-origin frontend read the header too
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"server-timing", value.encode()),
+                                                      (b"timing-allow-origin", b"*")]}
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            http_in_flight.dec()
+            _request_spans.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_seconds.observe((scope["method"], route, str(status)), time.perf_counter() - started)
@@ -0,0 +1,214 @@
+"""
+Partners - migrate.py
+Versioned schema migrations.
+
+    python migrate.py            apply pending migrations
+    python migrate.py --status   list applied / pending migrations
+
+Migrations live in migrations/NNNN_description.sql and run in version order,
+each in its own transaction, recorded in `schema_migrations`. A file whose
+first line is `-- migrate: no-transaction` runs statement by statement in
+autocommit mode instead — required for CREATE/DROP INDEX CONCURRENTLY.
+A Postgres advisory lock serialises runners, so when several workers boot at
+once only one migrates and the others find nothing left to do.
+"""
+
+import os
+import re
+import sys
+import time
+import hashlib
+from typing import NamedTuple
+
+from database import db_session, advisory_lock
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+LOCK_NAME = "partners:migrate"
+# A migration that cannot get its table lock fails fast instead of queueing live traffic behind it
+LOCK_TIMEOUT = os.environ.get("MIGRATION_LOCK_TIMEOUT", "10s")
+
+NO_TRANSACTION = "-- migrate: no-transaction"
+_FILENAME_RE = re.compile(r"^(\d{4})_([a-z0-9_]+)\.sql$")
+_CONCURRENT_INDEX_RE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    sql: str
+    checksum: str
+    transactional: bool
+
+
+# ============================================
+# DISCOVERY
+# ============================================
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> list:
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".sql"):
+            continue
+        match = _FILENAME_RE.match(filename)
+        if not match:
+            raise ValueError(f"Bad migration filename: {filename} (expected NNNN_description.sql)")
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            sql = f.read()
+        migrations.append(Migration(
+            version=int(match.group(1)),
+            name=match.group(2),
+            sql=sql,
+            checksum=hashlib.sha256(sql.encode()).hexdigest(),
+            transactional=not sql.lstrip().startswith(NO_TRANSACTION),
+        ))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration version numbers")
+    return migrations
+
+
+def _statements(sql: str) -> list:
+    """
+    Split a no-transaction migration into statements (one per `;` at end of line).
+    Only used for files without functions/DO blocks — keep those transactional.
+    """
+    statements = []
+    for chunk in re.split(r";\s*$", sql, flags=re.MULTILINE):
+        body = "\n".join(l for l in chunk.splitlines() if not l.strip().startswith("--")).strip()
+        if body:
+            statements.append(body)
+    return statements
+
+
+# ============================================
+# STATE
+# ============================================
+
+def _ensure_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version      INTEGER PRIMARY KEY,
+            name         TEXT NOT NULL,
+            checksum     TEXT NOT NULL,
+            applied_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            duration_ms  INTEGER
+        )
+    """)
+
+
+def _applied(cur) -> dict:
+    cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL AS present")
+    if not cur.fetchone()['present']:
+        return {}
+    cur.execute("SELECT version, name, checksum FROM schema_migrations")
+    return {r['version']: r for r in cur.fetchall()}
+
+
+def pending(migrations: list = None) -> list:
+    """Migrations not yet recorded. One read, no locks — cheap enough for every boot."""
+    migrations = load_migrations() if migrations is None else migrations
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            applied = _applied(cur)
+    return [m for m in migrations if m.version not in applied]
+
+
+# ============================================
+# APPLY
+# ============================================
+
+def _drop_invalid_index(cur, index_name: str):
+    """A failed CONCURRENTLY build leaves an INVALID index that IF NOT EXISTS would skip."""
+    cur.execute("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND NOT i.indisvalid
+    """, (index_name,))
+    if cur.fetchone():
+        print(f"[migrate] Dropping invalid index {index_name} left by an earlier attempt")
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"')
+
+
+def _apply(conn, m: Migration):
+    started = time.perf_counter()
+    if m.transactional:
+        conn.autocommit = False
+        try:
+            with conn.cursor() as cur:
+                cur.execute(m.sql)
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s)",
+                    (m.version, m.name, m.checksum, int((time.perf_counter() - started) * 1000)),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
+    else:
+        # Each statement commits on its own; every one must be safe to re-run.
+        # CONCURRENTLY waits out open transactions without blocking them, so no lock_timeout here.
+        with conn.cursor() as cur:
+            cur.execute("SET lock_timeout = 0")
+            try:
+                for statement in _statements(m.sql):
+                    index = _CONCURRENT_INDEX_RE.search(statement)
+                    if index:
+                        _drop_invalid_index(cur, index.group(1))
+                    cur.execute(statement)
+            finally:
+                cur.execute("SELECT set_config('lock_timeout', %s, false)", (LOCK_TIMEOUT,))
+            cur.execute(
+                "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (%s, %s, %s, %s)",
+                (m.version, m.name, m.checksum, int((time.perf_counter() - started) * 1000)),
+            )
+    print(f"[migrate] Applied {m.version:04d}_{m.name} in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+def migrate(migrations: list = None) -> list:
+    """Apply every pending migration under the advisory lock. Returns the ones this call applied."""
+    migrations = load_migrations() if migrations is None else migrations
+    done = []
+    with advisory_lock(LOCK_NAME) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT set_config('lock_timeout', %s, false)", (LOCK_TIMEOUT,))
+            _ensure_table(cur)
+            applied = _applied(cur)
+        for m in migrations:
+            if m.version in applied:
+                if applied[m.version]['checksum'] != m.checksum:
+                    print(f"[migrate] WARNING: {m.version:04d}_{m.name} changed after it was applied")
+                continue
+            _apply(conn, m)
+            done.append(m)
+    return done
+
+
+def migrate_if_needed() -> list:
+    """Boot path: a single read when the schema is current; lock and apply otherwise."""
+    migrations = load_migrations()
+    if not pending(migrations):
+        return []
+    return migrate(migrations)
+
+
+def status():
+    migrations = load_migrations()
+    with db_session() as conn:
+        with conn.cursor() as cur:
+            applied = _applied(cur)
+    for m in migrations:
+        state = "applied" if m.version in applied else "pending"
+        if m.version in applied and applied[m.version]['checksum'] != m.checksum:
+            state = "changed"
+        print(f"{m.version:04d}_{m.name:<40} {state}")
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        status()
+    else:
+        applied = migrate()
+        print(f"[migrate] {len(applied)} migration(s) applied" if applied else "[migrate] Schema is up to date")
@@ -0,0 +1,7 @@
+-- Follow graph (previously created on every app boot by create_follows_table)
+CREATE TABLE IF NOT EXISTS follows (
+    follower_username VARCHAR(255) REFERENCES builders(username) ON DELETE CASCADE,
+    following_username VARCHAR(255) REFERENCES builders(username) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (follower_username, following_username)
+);
@@ -0,0 +1,8 @@
+-- Conditional-request cache: refreshes send If-None-Match, and 304s are free.
+CREATE TABLE IF NOT EXISTS github_cache (
+    url            TEXT PRIMARY KEY,
+    etag           TEXT,
+    last_modified  TEXT,
+    body           JSONB NOT NULL,
+    fetched_at     TIMESTAMPTZ DEFAULT NOW()
+);
@@ -0,0 +1,2 @@
+-- Last GitHub refresh per builder (github_sync.py)
+ALTER TABLE builders ADD COLUMN IF NOT EXISTS github_synced_at TIMESTAMPTZ;
@@ -0,0 +1,23 @@
+-- Written in the same transaction as the triggering action; drained by
+-- email_dispatcher.py workers with FOR UPDATE SKIP LOCKED.
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id               BIGSERIAL PRIMARY KEY,
+    kind             TEXT NOT NULL,                 -- welcome | match
+    to_email         TEXT NOT NULL,
+    payload          JSONB NOT NULL,                -- rendered Resend payload
+    status           TEXT NOT NULL DEFAULT 'pending', -- pending | sending | delivered | failed
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    last_error       TEXT,
+    next_attempt_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_at        TIMESTAMPTZ,
+    created_at       TIMESTAMPTZ DEFAULT NOW(),
+    delivered_at     TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_outbox_pending
+    ON email_outbox(next_attempt_at) WHERE status IN ('pending', 'sending');
+
+-- match:{from}:{to}, coalesces repeat checks
+ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS dedupe_key TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_email_outbox_dedupe
+    ON email_outbox(dedupe_key) WHERE status = 'pending';
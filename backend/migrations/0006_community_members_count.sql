@@ -0,0 +1,30 @@
+-- members_count is kept in step by a trigger; repair with backend/reconcile_counts.py
+ALTER TABLE communities ADD COLUMN IF NOT EXISTS members_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION community_members_count() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE communities SET members_count = members_count + 1 WHERE id = NEW.community_id;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE communities SET members_count = members_count - 1 WHERE id = OLD.community_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_community_members_count ON community_members;
+CREATE TRIGGER trg_community_members_count
+    AFTER INSERT OR DELETE OR UPDATE OF community_id ON community_members
+    FOR EACH ROW EXECUTE FUNCTION community_members_count();
+
+-- Backfill counts for communities that existed before the trigger
+UPDATE communities c
+SET members_count = actual.n
+FROM (
+    SELECT c2.id, count(cm.username) AS n
+    FROM communities c2
+    LEFT JOIN community_members cm ON cm.community_id = c2.id
+    GROUP BY c2.id
+) actual
+WHERE c.id = actual.id AND c.members_count IS DISTINCT FROM actual.n;
@@ -0,0 +1,25 @@
+-- migrate: no-transaction
+-- Built CONCURRENTLY so reads and writes keep flowing while they build.
+
+-- /profile/{username}/stats follower count (the primary key only covers follower_username)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_follows_following
+    ON follows(following_username);
+
+-- Refresher queue: stalest GitHub data first (database.get_builders_to_refresh)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_builders_github_synced_at
+    ON builders(github_synced_at NULLS FIRST);
+
+-- Refresher "last seen" per builder, and delete_expired_sessions
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_username_created
+    ON sessions(username, created_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_created_at
+    ON sessions(created_at);
+
+-- enqueue_match_check: recent-delivery dedupe and the recipient's pending digest
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_email_outbox_dedupe_sent
+    ON email_outbox(dedupe_key, created_at) WHERE status IN ('sending', 'delivered');
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_email_outbox_match_pending
+    ON email_outbox(to_email, next_attempt_at) WHERE kind = 'match' AND status = 'pending';
+
+-- Superseded by idx_sessions_username_created (same leading column)
+DROP INDEX CONCURRENTLY IF EXISTS idx_sessions_username;
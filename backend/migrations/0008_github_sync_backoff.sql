@@ -0,0 +1,3 @@
+-- Failed GitHub refreshes back off instead of holding the head of the queue (github_sync.py)
+ALTER TABLE builders ADD COLUMN IF NOT EXISTS github_sync_failures INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE builders ADD COLUMN IF NOT EXISTS github_sync_retry_at TIMESTAMPTZ;
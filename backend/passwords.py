@@ -0,0 +1,137 @@
+"""
+Partners - passwords.py
+bcrypt hashing off the event loop.
+bcrypt costs hundreds of ms of CPU by design; running it inline in async
+handlers serializes the whole API behind a burst of logins. Hashes run on a
+dedicated, bounded thread pool (bcrypt releases the GIL) and stored hashes are
+upgraded on login whenever BCRYPT_ROUNDS changes.
+"""
+
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+BCRYPT_ROUNDS    = int(os.environ.get("BCRYPT_ROUNDS", 12))
+BCRYPT_WORKERS   = int(os.environ.get("BCRYPT_WORKERS", min(4, os.cpu_count() or 1)))
+# Hashes waiting for a pool thread before new ones are refused (503)
+BCRYPT_MAX_QUEUE = int(os.environ.get("BCRYPT_MAX_QUEUE", 64))
+
+_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_lock = threading.Lock()
+_stats = {"submitted": 0, "completed": 0, "running": 0, "cancelled": 0, "rejected": 0, "rehashed": 0, "max_depth": 0}
+
+
+class PasswordPoolBusy(Exception):
+    """Too many hashes queued — shed the request instead of queueing it."""
+
+
+# ============================================
+# SYNC PRIMITIVES
+# ============================================
+
+def hash_password(password: str) -> str:
+    """Hash a password using bcrypt at BCRYPT_ROUNDS."""
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its bcrypt hash."""
+    if not hashed_password:
+        return False
+    if not (hashed_password.startswith('$2b$') or hashed_password.startswith('$2a$')):
+        # Not a bcrypt hash — reject. Run migration to rehash legacy accounts.
+        print("[auth] WARNING: plain-text password detected for a user — login blocked until rehashed")
+        return False
+    try:
+        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    except Exception:
+        return False
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True when a stored bcrypt hash uses a different cost than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed_password.split('$')[2]) != BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+
+# ============================================
+# POOL
+# ============================================
+
+def _depth() -> int:
+    # Caller holds _lock. Cancelled jobs never ran, so they balance their own submit.
+    return _stats["submitted"] - _stats["completed"] - _stats["running"] - _stats["cancelled"]
+
+
+def queue_depth() -> int:
+    """Hashes submitted but not yet picked up by a pool thread."""
+    with _lock:
+        return _depth()
+
+
+def pool_stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            "depth": _depth(),
+            "workers": BCRYPT_WORKERS,
+            "rounds": BCRYPT_ROUNDS,
+        }
+
+
+def _tracked(fn, *args):
+    with _lock:
+        _stats["running"] += 1
+    try:
+        return fn(*args)
+    finally:
+        with _lock:
+            _stats["running"] -= 1
+            _stats["completed"] += 1
+
+
+async def _submit(fn, *args):
+    with _lock:
+        depth = _depth()
+        if depth >= BCRYPT_MAX_QUEUE:
+            _stats["rejected"] += 1
+            raise PasswordPoolBusy()
+        _stats["submitted"] += 1
+        _stats["max_depth"] = max(_stats["max_depth"], depth + 1)
+    future = _executor.submit(_tracked, fn, *args)
+    # If the awaiting request is cancelled while the job is still queued, the job
+    # is dropped before _tracked runs — count it so the depth does not drift up
+    future.add_done_callback(_count_cancelled)
+    return await asyncio.wrap_future(future)
+
+
+def _count_cancelled(future):
+    if future.cancelled():
+        with _lock:
+            _stats["cancelled"] += 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _submit(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _submit(verify_password, plain_password, hashed_password)
+
+
+async def upgrade_hash_if_needed(plain_password: str, hashed_password: str):
+    """
+    After a successful login: return a fresh hash at the current cost, or None
+    if the stored one is already current.
+    """
+    if not needs_rehash(hashed_password):
+        return None
+    new_hash = await hash_password_async(plain_password)
+    with _lock:
+        _stats["rehashed"] += 1
+    return new_hash
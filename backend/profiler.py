@@ -0,0 +1,254 @@
+"""
+Partners - profiler.py
+On-demand sampling profiler for the live process (admin only, ADMIN_TOKEN).
+  POST /admin/profile?seconds=10&format=speedscope   sample every thread of the
+                                                     worker for N seconds
+  any request + "X-Profile: collapsed|speedscope"    profile just that request:
+                                                     the body is replaced by its profile
+Both need "Authorization: Bearer $ADMIN_TOKEN". Output is either collapsed
+stacks (flamegraph.pl, inferno, speedscope) or a speedscope JSON file.
+
+A sampler thread reads sys._current_frames() every interval — nothing is
+hooked into the interpreter, and nothing runs at all while no profile is
+being taken. Sampling is wall-clock: threads parked in a wait (idle pool
+threads, the selector) are dropped unless idle=true.
+"""
+
+import os
+import sys
+import time
+import hmac
+import uuid
+import asyncio
+import threading
+from collections import Counter
+
+import orjson
+
+ADMIN_TOKEN         = os.environ.get("ADMIN_TOKEN", "").strip()
+MAX_PROFILE_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 60))
+
+FORMATS = ("collapsed", "speedscope")
+
+# Leaf frames (file, function) that mean "waiting, not working"
+IDLE_LEAVES = {
+    ("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"),
+    ("thread.py", "_worker"), ("socket.py", "accept"),
+}
+
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_frame_names = {}   # code object → display name (computed once per function)
+
+
+def enabled() -> bool:
+    return bool(ADMIN_TOKEN)
+
+
+def is_admin(authorization: str) -> bool:
+    if not ADMIN_TOKEN or not authorization:
+        return False
+    return hmac.compare_digest(authorization, f"Bearer {ADMIN_TOKEN}")
+
+
+def _short_path(path: str) -> str:
+    if path.startswith(_BACKEND_DIR):
+        return path[len(_BACKEND_DIR):]
+    marker = "site-packages" + os.sep
+    if marker in path:
+        return path.split(marker, 1)[1]
+    return os.path.basename(path)
+
+
+def _frame_name(code) -> str:
+    name = _frame_names.get(code)
+    if name is None:
+        qualname = getattr(code, "co_qualname", code.co_name)
+        name = _frame_names[code] = f"{qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+    return name
+
+
+def _is_idle(code) -> bool:
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES
+
+
+# ============================================
+# SAMPLER
+# ============================================
+
+class Sampler:
+    """
+    Collects (thread name, frame names root→leaf) → seconds. Each sample is
+    weighted by the real time since the previous one: while the loop thread
+    holds the GIL the sampler wakes late, and a fixed weight would under-count
+    exactly the CPU-bound code being looked for.
+    `only(thread_ident)` restricts which threads are sampled (per-request mode).
+    """
+
+    def __init__(self, interval: float = 0.005, include_idle: bool = False, only=None):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.only = only
+        self.samples = Counter()
+        self.count = 0
+        self.started = self.stopped = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.stopped = time.perf_counter()
+        return self
+
+    def _run(self):
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            names = {t.ident: t.name for t in threading.enumerate()}
+            frame = None
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (self.only is not None and not self.only(ident)):
+                    continue
+                if not self.include_idle and _is_idle(frame.f_code):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[(names.get(ident, str(ident)), tuple(stack))] += weight
+                self.count += 1
+            del frame
+
+    # ── Output ────────────────────────────────────────────────
+
+    def collapsed(self) -> bytes:
+        """Brendan Gregg's folded format: thread;root;…;leaf microseconds"""
+        lines = [
+            ";".join((thread,) + stack) + f" {round(seconds * 1e6)}"
+            for (thread, stack), seconds in self.samples.most_common()
+        ]
+        return ("\n".join(lines) + "\n").encode()
+
+    def speedscope(self, name: str = "partners") -> bytes:
+        """speedscope file format: one sampled profile per thread, weights in ms."""
+        frames, index = [], {}
+        by_thread = {}
+        for (thread, stack), seconds in self.samples.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame})
+                ids.append(index[frame])
+            samples, weights = by_thread.setdefault(thread, ([], []))
+            samples.append(ids)
+            weights.append(round(seconds * 1000, 3))
+        profiles = [
+            {
+                "type": "sampled", "name": thread, "unit": "milliseconds",
+                "startValue": 0, "endValue": round(sum(weights), 3),
+                "samples": samples, "weights": weights,
+            }
+            for thread, (samples, weights) in sorted(by_thread.items())
+        ]
+        return orjson.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name, "exporter": "partners-profiler",
+            "shared": {"frames": frames}, "profiles": profiles,
+        })
+
+    def render(self, fmt: str, name: str = "partners") -> tuple[bytes, str]:
+        if fmt == "speedscope":
+            return self.speedscope(name), "application/json"
+        return self.collapsed(), "text/plain; charset=utf-8"
+
+
+# ============================================
+# WHOLE-PROCESS PROFILE
+# ============================================
+
+_busy = asyncio.Lock()
+
+
+async def profile_process(seconds: float, interval_ms: float = 5, include_idle: bool = False) -> Sampler:
+    """Sample every thread of this worker for `seconds`. One at a time per worker."""
+    seconds = max(0.1, min(seconds, MAX_PROFILE_SECONDS))
+    async with _busy:
+        sampler = Sampler(interval_ms / 1000, include_idle).start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+        return sampler
+
+
+# ============================================
+# PER-REQUEST PROFILE
+# ============================================
+
+class RequestProfilerMiddleware:
+    """
+    Installed only when ADMIN_TOKEN is set; otherwise costs nothing. For an
+    admin request carrying X-Profile, samples the loop thread whenever this
+    request's task is the one running, and answers with the profile instead of
+    the response (the original status is kept in X-Profile-Status).
+    """
+
+    def __init__(self, app, interval_ms: float = 1):
+        self.app = app
+        self.interval = interval_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or ())
+        fmt = headers.get(b"x-profile")
+        if fmt is None or not is_admin(headers.get(b"authorization", b"").decode("latin-1")):
+            return await self.app(scope, receive, send)
+
+        fmt = fmt.decode("latin-1").strip().lower()
+        fmt = fmt if fmt in FORMATS else "collapsed"
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        loop_thread = threading.get_ident()
+        sampler = Sampler(
+            self.interval, include_idle=True,
+            only=lambda ident: ident == loop_thread and asyncio.tasks._current_tasks.get(loop) is task,
+        )
+        status = 500
+
+        async def swallow(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, swallow)
+        finally:
+            sampler.stop()
+
+        route = getattr(scope.get("route"), "path", None) or scope["path"]
+        body, content_type = sampler.render(fmt, f"{scope['method']} {route}")
+        elapsed_ms = (sampler.stopped - sampler.started) * 1000
+        filename = f"profile-{uuid.uuid4().hex[:8]}.{'json' if fmt == 'speedscope' else 'txt'}"
+        await send({
+            "type": "http.response.start", "status": 200,
+            "headers": [
+                (b"content-type", content_type.encode()),
+                (b"content-disposition", f'attachment; filename="{filename}"'.encode()),
+                (b"x-profile-status", str(status).encode()),
+                (b"x-profile-duration-ms", f"{elapsed_ms:.1f}".encode()),
+                (b"x-profile-samples", str(sampler.count).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
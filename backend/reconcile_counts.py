@@ -0,0 +1,16 @@
+"""
+Backfill / reconcile communities.members_count.
+
+The count is maintained by the trg_community_members_count trigger; run this
+once after adding the column, or any time the counts are suspected to drift.
+
+    python reconcile_counts.py
+"""
+
+from database import reconcile_members_count
+
+if __name__ == "__main__":
+    fixed = reconcile_members_count()
+    for row in fixed:
+        print(f"  [~] {row['name']}: {row['old']} -> {row['new']}")
+    print(f"Done. {len(fixed)} communities corrected.")
@@ -0,0 +1,65 @@
+"""
+Partners - singleflight.py
+Request coalescing: concurrent callers asking for the same (operation,
+arguments) share one in-flight computation instead of each running it.
+A double-clicked chemistry check or two pages loading the same profile cost
+one set of queries and one Gemini call.
+
+    matches = SingleFlight("match")
+    result = await matches.do((me, target), lambda: compute(me, target))
+
+The computation runs in its own task, so a caller that disconnects (and is
+cancelled) does not cancel it for the others. Nothing is remembered once it
+finishes — this is not a cache (cache.Cache.get_or_compute builds one on top).
+Per process, like the other in-memory state.
+"""
+
+import asyncio
+import inspect
+
+
+class SingleFlight:
+    """
+    One operation's in-flight computations, keyed by its arguments.
+      do(key, fn)   await fn() — or the already-running call for `key`.
+                    `async def` functions are awaited, plain ones run in a
+                    worker thread. Results and exceptions reach every caller.
+    stats: calls, coalesced (callers that joined a running call), errors.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight = {}
+        self.stats = {"calls": 0, "coalesced": 0, "errors": 0}
+        ALL_GROUPS.append(self)
+
+    def __contains__(self, key) -> bool:
+        return key in self._inflight
+
+    async def do(self, key, fn):
+        self.stats["calls"] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = self._inflight[key] = asyncio.ensure_future(self._run(key, fn))
+            # Retrieved even if every caller was cancelled — no "never retrieved" warning
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task)
+
+    async def _run(self, key, fn):
+        try:
+            if inspect.iscoroutinefunction(fn):
+                return await fn()
+            return await asyncio.to_thread(fn)
+        except BaseException:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+
+ALL_GROUPS = []
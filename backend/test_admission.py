@@ -0,0 +1,104 @@
+"""
+Partners - test_admission.py
+/match admission control: token-bucket refill and exhaustion (on an injected
+clock), the non-blocking Gemini slots, and /match answering with the
+algorithm and a `degraded` reason when a builder's bucket is empty. The
+session and profile lookups are overridden, so no database is needed.
+
+    python test_admission.py
+    pytest test_admission.py
+"""
+
+import os
+from unittest import mock
+
+import admission
+from admission import TokenBuckets
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_a_burst_then_refuses():
+    buckets = TokenBuckets(rate_per_min=6, burst=3, clock=_Clock())
+    assert [buckets.take("ada") for _ in range(4)] == [True, True, True, False]
+    assert buckets.take("grace"), "buckets are per key"
+
+
+def test_bucket_refills_at_the_configured_rate():
+    clock = _Clock()
+    buckets = TokenBuckets(rate_per_min=6, burst=2, clock=clock)   # one token per 10s
+    assert buckets.take("ada") and buckets.take("ada") and not buckets.take("ada")
+    clock.now += 5
+    assert not buckets.take("ada"), "half a token is not enough"
+    clock.now += 5
+    assert buckets.take("ada")
+    clock.now += 3600
+    assert buckets.take("ada") and buckets.take("ada") and not buckets.take("ada"), "refill is capped at burst"
+
+
+def test_refund_returns_a_token():
+    buckets = TokenBuckets(rate_per_min=0, burst=1, clock=_Clock())
+    assert buckets.take("ada") and not buckets.take("ada")
+    buckets.refund("ada")
+    assert buckets.take("ada")
+
+
+def test_gemini_slots_never_wait():
+    with mock.patch.object(admission, "match_buckets", TokenBuckets(60, 10, clock=_Clock())), \
+         mock.patch.object(admission, "_gemini_slots", admission.threading.BoundedSemaphore(1)):
+        with admission.gemini_match("ada") as first:
+            with admission.gemini_match("grace") as second:
+                assert first is None and second == admission.BUSY
+        with admission.gemini_match("grace") as third:
+            assert third is None, "slot released on exit"
+
+
+def test_match_degrades_to_algorithm_when_bucket_is_empty():
+    from fastapi.testclient import TestClient
+    # database.py needs a URL to import; scoped so it does not leak into other tests
+    with mock.patch.dict(os.environ, {"DATABASE_URL": os.environ.get("DATABASE_URL", "postgresql://localhost/unused")}):
+        import main
+    from cache import profile_body
+
+    def builder(username, languages):
+        return {"username": username, "github_username": username, "avatar": "", "bio": "",
+                "building_style": "ships_fast", "interests": ["web"], "open_to": [], "availability": "open",
+                "github_languages": languages, "github_repos": [], "total_stars": 0, "public_repos": 0,
+                "learning": [], "experience_level": "intermediate", "looking_for": "build_partner",
+                "created_at": "2026-01-01T00:00:00", "updated_at": "2026-01-01T00:00:00"}
+
+    me, target = builder("ada", ["Python"]), builder("grace", ["TypeScript"])
+
+    async def load_profile(username):
+        return profile_body(target) if username == "grace" else None
+
+    gemini = mock.Mock(side_effect=AssertionError("Gemini called for a refused check"))
+    main.app.dependency_overrides[main.require_builder] = lambda: main.CurrentBuilder("ada", me)
+    try:
+        with mock.patch.object(main, "load_profile", load_profile), \
+             mock.patch.object(main, "ai_enabled", lambda: True), \
+             mock.patch("brain._get_gemini_client", gemini), \
+             mock.patch.object(admission, "match_buckets", TokenBuckets(6, 0, clock=_Clock())):
+            res = TestClient(main.app).post("/match/grace", params={"session_id": "s"})
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert res.status_code == 200, res.text
+    body = res.json()
+    assert body["degraded"] == admission.RATE_LIMITED
+    assert body["matched_builder"]["username"] == "grace"
+    assert 0 <= body["chemistry_score"] <= 100 and body["why"] and body["build_idea"]
+    gemini.assert_not_called()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"PASS {name}")
@@ -0,0 +1,171 @@
+"""
+Partners - test_cache.py
+cache.Cache over both backends: the in-process LRU and RedisBackend on a
+fakeredis client (skipped when fakeredis is not installed). No server needed.
+
+    python test_cache.py
+    pytest test_cache.py
+"""
+
+import time
+import asyncio
+import threading
+
+from cache import Cache, LocalBackend, RedisBackend, etag_matches
+
+
+def _backends() -> dict:
+    backends = {"local": lambda: LocalBackend(maxsize=100)}
+    try:
+        import fakeredis
+        backends["redis"] = lambda: RedisBackend(client=fakeredis.FakeRedis())
+    except ImportError:
+        pass
+    return backends
+
+
+def _each_backend(check):
+    for name, make in _backends().items():
+        try:
+            check(Cache("test", ttl=60, backend=make()))
+        except AssertionError as e:
+            raise AssertionError(f"[{name}] {e}") from e
+
+
+class _Broken:
+    """A backend whose every call fails (Redis down)."""
+    shared = False
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("backend down")
+        return fail
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def test_get_set_and_ttl_expiry():
+    def check(c):
+        assert c.get("a") is None
+        c.set("a", {"n": 1})
+        assert c.get("a") == {"n": 1}
+        c.set("short", "x", ttl=0.05)
+        assert c.get("short") == "x"
+        time.sleep(0.1)
+        assert c.get("short") is None, "entry outlived its TTL"
+        c.delete("a")
+        assert c.get("a") is None
+    _each_backend(check)
+
+
+def test_lru_eviction():
+    c = Cache("test", ttl=60, backend=LocalBackend(maxsize=3))
+    for key in ("a", "b", "c"):
+        c.set(key, key)
+    assert c.get("a") == "a"       # a is now most recently used
+    c.set("d", "d")                # evicts b, the least recently used
+    assert c.get("b") is None
+    assert [c.get(k) for k in ("a", "c", "d")] == ["a", "c", "d"]
+
+
+def test_bump_retires_scoped_keys():
+    def check(c):
+        c.set("members", [1, 2], scope="community:1")
+        c.set("members", [3], scope="community:2")
+        c.set("plain", "kept")
+        c.bump("community:1")
+        assert c.get("members", scope="community:1") is None
+        assert c.get("members", scope="community:2") == [3]
+        assert c.get("plain") == "kept"
+        c.set("members", [1, 2, 4], scope="community:1")
+        assert c.get("members", scope="community:1") == [1, 2, 4]
+    _each_backend(check)
+
+
+def test_set_that_lost_a_race_to_delete_is_dropped():
+    def check(c):
+        generation = c.generation()   # a reader starts its DB query…
+        c.delete("profile")           # …a writer invalidates meanwhile…
+        c.set("profile", "stale", generation=generation)
+        assert c.get("profile") is None, "stale read was cached after delete()"
+        c.set("profile", "fresh", generation=c.generation())
+        assert c.get("profile") == "fresh"
+    _each_backend(check)
+
+
+def test_delete_in_another_worker_drops_a_racing_set():
+    try:
+        import fakeredis
+    except ImportError:
+        return
+    server = fakeredis.FakeServer()
+    worker_a, worker_b = (Cache("test", ttl=60, backend=RedisBackend(client=fakeredis.FakeRedis(server=server)))
+                          for _ in range(2))
+    worker_a.set("session", "ada")
+    generation = worker_a.generation()   # worker A starts a cold read…
+    worker_b.delete("session")           # …worker B logs the session out
+    worker_a.set("session", "ada", generation=generation)
+    assert worker_b.get("session") is None, "revoked session written back by another worker"
+
+    generation = worker_a.generation()
+    worker_b.delete_many(["expired-1", "expired-2"])   # the expired-session purge
+    worker_a.set("expired-1", "ada", generation=generation)
+    assert worker_b.get("expired-1") is None, "purged session written back by another worker"
+
+
+def test_get_or_compute_coalesces_concurrent_misses():
+    def check(c):
+        calls = []
+        release = threading.Event()
+
+        def load():
+            calls.append(1)
+            release.wait(1)
+            return "value"
+
+        async def run():
+            waiters = [asyncio.ensure_future(c.get_or_compute("k", load)) for _ in range(5)]
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(*waiters)
+
+        assert asyncio.run(run()) == ["value"] * 5
+        assert len(calls) == 1, f"loader ran {len(calls)} times"
+        assert c.stats["coalesced"] == 4
+        assert c.get("k") == "value"
+    _each_backend(check)
+
+
+def test_backend_errors_count_as_misses():
+    c = Cache("test", ttl=60, backend=_Broken())
+    assert c.get("a") is None
+    c.set("a", 1)                  # swallowed
+    c.delete("a")
+    assert asyncio.run(c.get_or_compute("a", lambda: "loaded")) == "loaded"
+    assert c.stats["misses"] >= 2
+    assert c.stats["errors"] >= 4
+
+
+def test_etag_matches():
+    etag = '"abc123"'
+    assert etag_matches('"abc123"', etag)
+    assert etag_matches('"old", "abc123"', etag), "list of tags"
+    assert etag_matches('W/"abc123"', etag), "weak comparison ignores W/"
+    assert etag_matches('"x",W/"abc123"', etag)
+    assert etag_matches('*', etag)
+    assert etag_matches('  "abc123"  ', etag), "surrounding whitespace"
+    assert etag_matches('"a" ,  "abc123" ', etag)
+    assert not etag_matches('"abc124"', etag)
+    assert not etag_matches('"x", "y"', etag)
+    assert not etag_matches('abc123', etag), "unquoted tag is a different tag"
+    assert not etag_matches('', etag)
+    assert not etag_matches(None, etag)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"PASS {name}")
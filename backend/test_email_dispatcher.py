@@ -0,0 +1,87 @@
+"""
+Partners - test_email_dispatcher.py
+Worker-loop resilience: an exception while sending one outbox group (digest
+rendering, mark_outbox_delivered / mark_outbox_failed) must not kill the
+worker, and no workers poll the outbox without a Resend key. The outbox
+functions are replaced in-process; no database is used.
+
+    python test_email_dispatcher.py
+    pytest test_email_dispatcher.py
+"""
+
+import os
+import asyncio
+from unittest import mock
+
+# database.py needs a URL to import; scoped so it does not leak into other tests
+with mock.patch.dict(os.environ, {"DATABASE_URL": os.environ.get("DATABASE_URL", "postgresql://localhost/unused")}):
+    import email_dispatcher
+    from email_dispatcher import EmailDispatcher
+
+
+def _row(i: int) -> dict:
+    return {"id": i, "kind": "welcome", "to_email": f"b{i}@example.com", "attempts": 1,
+            "payload": {"to": f"b{i}@example.com", "subject": "hi", "html": "<p>hi</p>"}}
+
+
+async def _run_worker(batches: list, delivered_side_effect) -> tuple:
+    """Feed `batches` to one worker (then empty claims); return (claims, delivered ids, stats)."""
+    claims, delivered = [], []
+    queue = list(batches)
+
+    def claim(batch_size, lease):
+        claims.append(1)
+        return queue.pop(0) if queue else []
+
+    def mark_delivered(ids):
+        delivered_side_effect(ids)
+        delivered.extend(ids)
+
+    dispatcher = EmailDispatcher(workers=1, batch_size=1, send_rate=0)
+    with mock.patch.object(email_dispatcher, "outbox_enabled", lambda: True), \
+         mock.patch.object(email_dispatcher, "claim_outbox_batch", claim), \
+         mock.patch.object(email_dispatcher, "deliver", lambda payload: None), \
+         mock.patch.object(email_dispatcher, "mark_outbox_delivered", mark_delivered), \
+         mock.patch.object(email_dispatcher, "mark_outbox_failed", lambda *a: None):
+        await dispatcher.start()
+        for _ in range(100):
+            if len(claims) > len(batches):
+                break
+            await asyncio.sleep(0.01)
+        alive = not dispatcher._tasks[0].done()
+        await dispatcher.drain(timeout=1)
+    return alive, delivered, dispatcher.stats
+
+
+def test_worker_survives_failing_mark_delivered():
+    calls = {"n": 0}
+
+    def fail_first(ids):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise RuntimeError("connection lost")
+
+    alive, delivered, stats = asyncio.run(_run_worker([[_row(1)], [_row(2)]], fail_first))
+    assert alive, "worker task died"
+    assert delivered == [2], delivered          # the second row was still processed
+    assert stats["errors"] == 1 and stats["sent"] == 2
+
+
+def test_no_workers_without_a_resend_key():
+    async def run():
+        dispatcher = EmailDispatcher(workers=2)
+        with mock.patch.object(email_dispatcher, "outbox_enabled", lambda: False), \
+             mock.patch.object(email_dispatcher, "claim_outbox_batch", mock.Mock(side_effect=AssertionError("polled"))):
+            await dispatcher.start()
+            await asyncio.sleep(0.01)
+        assert dispatcher._tasks == []
+        await dispatcher.drain(timeout=1)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"PASS {name}")
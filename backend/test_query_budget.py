@@ -0,0 +1,83 @@
+"""
+Partners - test_query_budget.py
+Query-count regression check: runs the data-layer reads behind the hot
+endpoints under database.query_profile() and fails if one issues more
+statements than its budget or repeats a statement (N+1). Needs DATABASE_URL
+pointing at a database the migrations can run against (they are applied first).
+
+    python test_query_budget.py        # report + check
+    pytest test_query_budget.py        # same check under pytest (skipped when the database is unreachable)
+"""
+
+import os
+import sys
+import uuid
+
+# Statements allowed per call. Lower these when an endpoint gets cheaper — never raise them quietly.
+BUDGETS = {
+    "get_session_builder":           1,   # SessionBuilder cold path (sessions JOIN builders)
+    "get_builder_profile":           1,   # GET /profile/{username}
+    "get_follow_stats":              1,   # GET /profile/{username}/stats
+    "get_following_list":            1,   # GET /profile/following/list
+    "get_communities":               1,   # GET /communities
+    "get_community_member_profiles": 1,   # GET /communities/{id}/members
+}
+
+
+def _calls():
+    import database
+    missing = f"nobody_{uuid.uuid4().hex[:8]}"
+    return {
+        "get_session_builder":           lambda: database.get_session_builder(str(uuid.uuid4())),
+        "get_builder_profile":           lambda: database.get_builder_profile(missing),
+        "get_follow_stats":              lambda: database.get_follow_stats(missing, viewer=missing + "_2"),
+        "get_following_list":            lambda: database.get_following_list(missing),
+        "get_communities":               lambda: database.get_communities(),
+        "get_community_member_profiles": lambda: database.get_community_member_profiles(str(uuid.uuid4())),
+    }
+
+
+def measure() -> dict:
+    """name → QueryProfile for one call of each budgeted function."""
+    from database import query_profile
+    from migrate import migrate_if_needed
+
+    migrate_if_needed()
+    profiles = {}
+    for name, call in _calls().items():
+        with query_profile(budget=BUDGETS[name]) as profile:
+            call()
+        profiles[name] = profile
+    return profiles
+
+
+def _database_reachable() -> bool:
+    try:
+        import database
+        database.get_db_conn(connect_timeout=2).close()
+    except Exception:
+        return False
+    return True
+
+
+def test_query_budgets():
+    if not _database_reachable():
+        import pytest
+        pytest.skip("database not reachable (DATABASE_URL)")
+    failures = []
+    for name, profile in measure().items():
+        if profile.flagged:
+            failures.append(profile.summary(f"{name}:"))
+    assert not failures, "\n".join(failures)
+
+
+if __name__ == "__main__":
+    profiles = measure()
+    failed = False
+    for name, profile in profiles.items():
+        status = "FAIL" if profile.flagged else "PASS"
+        failed = failed or profile.flagged
+        print(f"{status} {name:<32} {profile.count} statement(s) (budget {BUDGETS[name]}), {profile.total_ms:.1f}ms")
+        if profile.flagged:
+            print(profile.summary(name))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,94 @@
+"""
+Partners - test_singleflight.py
+singleflight.SingleFlight: concurrent calls for one key share a run, errors
+reach every caller, keys are released afterwards, and a cancelled caller
+does not strand the others. No server needed.
+
+    python test_singleflight.py
+    pytest test_singleflight.py
+"""
+
+import asyncio
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_run_once():
+    group = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        return await asyncio.gather(*(group.do("k", work) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["done"] * 10
+    assert len(calls) == 1
+    assert group.stats == {"calls": 10, "coalesced": 9, "errors": 0}
+
+
+def test_sync_functions_run_in_a_thread():
+    group = SingleFlight("test")
+    assert asyncio.run(group.do("k", lambda: 7)) == 7
+
+
+def test_exception_reaches_every_waiter():
+    group = SingleFlight("test")
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def run():
+        return await asyncio.gather(*(group.do("k", boom) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results), results
+    assert group.stats["errors"] == 1
+
+
+def test_key_is_released_after_completion():
+    group = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        first = await group.do("k", work)
+        assert "k" not in group and group.in_flight() == 0
+        second = await group.do("k", work)
+        return first, second
+
+    assert asyncio.run(run()) == (1, 2)
+
+
+def test_cancelled_leader_does_not_strand_followers():
+    group = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        leader = asyncio.ensure_future(group.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await asyncio.wait_for(follower, timeout=1)
+        assert leader.cancelled()
+        return result
+
+    assert asyncio.run(run()) == "value"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"PASS {name}")
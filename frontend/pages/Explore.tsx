@@ -88,7 +88,10 @@ const Explore: React.FC<{ setActiveTab?: (tab: string) => void }> = ({ setActive
     setMatchResult(null);
     setLoadingMembers(true);
     try {
-      const res = await fetch(`${API_URL}/communities/${comm.id}/members`);
+      // Member lists are HTTP-cached; revalidate if we just joined so we show up in it
+      const res = await fetch(`${API_URL}/communities/${comm.id}/members`, {
+        cache: joinedIds.has(comm.id) ? 'no-cache' : 'default',
+      });
       const data = await safeJson(res);
       setMembers(data.members || []);
     } catch (e) {
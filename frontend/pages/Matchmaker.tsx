@@ -169,6 +169,11 @@ const Discover: React.FC = () => {
                     <h4 className="text-[10px] font-mono font-black text-terminal-green uppercase tracking-[0.2em] mb-2">Build_Proposal</h4>
                     <p className="text-white text-sm font-medium italic">"{matchResult.build_idea}"</p>
                   </div>
+                  {matchResult.degraded && (
+                    <p className="text-[10px] font-mono text-slate-500 uppercase tracking-widest">
+                      // quick_scan: AI analysis {matchResult.degraded === 'rate_limited' ? 'cooling down' : 'busy'}, try again shortly
+                    </p>
+                  )}
                 </div>
               </div>
             </div>
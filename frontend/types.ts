@@ -34,6 +34,7 @@ export interface MatchResult {
   vibe: string;
   why: string;
   build_idea: string;
+  degraded?: 'rate_limited' | 'busy' | null;
 }
 
 export interface Session {
@@ -1,5 +1,7 @@
 -- Partners — Supabase PostgreSQL Schema
--- Run this in the Supabase SQL Editor to initialise the database.
+-- Snapshot of the full schema, for reading and for seeding a new Supabase
+-- project in the SQL Editor. Schema changes are made as numbered files in
+-- backend/migrations/ and applied with `python backend/migrate.py`.
 
 -- ── Builders ──────────────────────────────────────────────────
 CREATE TABLE IF NOT EXISTS builders (
@@ -22,6 +24,9 @@ CREATE TABLE IF NOT EXISTS builders (
     experience_level  TEXT DEFAULT 'intermediate',
     looking_for       TEXT DEFAULT 'build_partner',
     email             TEXT DEFAULT '',
+    github_synced_at  TIMESTAMPTZ,             -- last GitHub refresh (github_sync.py)
+    github_sync_failures INTEGER NOT NULL DEFAULT 0,  -- consecutive failed refreshes
+    github_sync_retry_at TIMESTAMPTZ,          -- failed refresh backoff (github_sync.py)
     created_at        TIMESTAMPTZ DEFAULT NOW(),
     updated_at        TIMESTAMPTZ DEFAULT NOW()
 );
@@ -33,7 +38,9 @@ CREATE TABLE IF NOT EXISTS sessions (
     created_at  TIMESTAMPTZ DEFAULT NOW()
 );
 
-CREATE INDEX IF NOT EXISTS idx_sessions_username ON sessions(username);
+CREATE INDEX IF NOT EXISTS idx_sessions_username_created ON sessions(username, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions(created_at);
+CREATE INDEX IF NOT EXISTS idx_builders_github_synced_at ON builders(github_synced_at NULLS FIRST);
 
 -- ── Communities ───────────────────────────────────────────────
 CREATE TABLE IF NOT EXISTS communities (
@@ -57,6 +64,26 @@ CREATE TABLE IF NOT EXISTS community_members (
 
 CREATE INDEX IF NOT EXISTS idx_community_members_username ON community_members(username);
 
+-- members_count is kept in step by a trigger; repair with backend/reconcile_counts.py
+ALTER TABLE communities ADD COLUMN IF NOT EXISTS members_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION community_members_count() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE communities SET members_count = members_count + 1 WHERE id = NEW.community_id;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE communities SET members_count = members_count - 1 WHERE id = OLD.community_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_community_members_count ON community_members;
+CREATE TRIGGER trg_community_members_count
+    AFTER INSERT OR DELETE OR UPDATE OF community_id ON community_members
+    FOR EACH ROW EXECUTE FUNCTION community_members_count();
+
 -- ── Seed Communities ──────────────────────────────────────────
 INSERT INTO communities (name, description, type) VALUES
     ('AI Tools',     'Building with LLMs, agents, and AI-powered products',            'interest'),
@@ -71,3 +98,50 @@ INSERT INTO communities (name, description, type) VALUES
     ('San Francisco Hub', 'Connect with builders in the heart of SF',                 'city'),
     ('Casablanca Devs', 'Growing the tech ecosystem in Casablanca',                   'city')
 ON CONFLICT DO NOTHING;
+
+-- ── Follows ───────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS follows (
+    follower_username VARCHAR(255) REFERENCES builders(username) ON DELETE CASCADE,
+    following_username VARCHAR(255) REFERENCES builders(username) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (follower_username, following_username)
+);
+
+CREATE INDEX IF NOT EXISTS idx_follows_following ON follows(following_username);
+
+-- ── GitHub Response Cache ─────────────────────────────────────
+-- Conditional-request cache: refreshes send If-None-Match, and 304s are free.
+CREATE TABLE IF NOT EXISTS github_cache (
+    url            TEXT PRIMARY KEY,
+    etag           TEXT,
+    last_modified  TEXT,
+    body           JSONB NOT NULL,
+    fetched_at     TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- ── Email Outbox ──────────────────────────────────────────────
+-- Written in the same transaction as the triggering action; drained by
+-- email_dispatcher.py workers with FOR UPDATE SKIP LOCKED.
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id               BIGSERIAL PRIMARY KEY,
+    kind             TEXT NOT NULL,                 -- welcome | match
+    to_email         TEXT NOT NULL,
+    payload          JSONB NOT NULL,                -- rendered Resend payload
+    status           TEXT NOT NULL DEFAULT 'pending', -- pending | sending | delivered | failed
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    last_error       TEXT,
+    next_attempt_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_at        TIMESTAMPTZ,
+    created_at       TIMESTAMPTZ DEFAULT NOW(),
+    delivered_at     TIMESTAMPTZ,
+    dedupe_key       TEXT                           -- match:{from}:{to}, coalesces repeat checks
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_outbox_pending
+    ON email_outbox(next_attempt_at) WHERE status IN ('pending', 'sending');
+CREATE UNIQUE INDEX IF NOT EXISTS idx_email_outbox_dedupe
+    ON email_outbox(dedupe_key) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_email_outbox_dedupe_sent
+    ON email_outbox(dedupe_key, created_at) WHERE status IN ('sending', 'delivered');
+CREATE INDEX IF NOT EXISTS idx_email_outbox_match_pending
+    ON email_outbox(to_email, next_attempt_at) WHERE kind = 'match' AND status = 'pending';